@@ -1,17 +1,34 @@
 # ban.py - User banning and unbanning functionality across all registered channels
 import logging
-import asyncio
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Optional
 from telegram import Update
-from telegram.ext import ContextTypes, CommandHandler
+from telegram.ext import ContextTypes
 from telegram.error import BadRequest, Forbidden
+from dead_channels import ChannelHealth, pruned_note
+from fanout import FanoutEngine, MODERATION_CONCURRENCY
+from jobs import FanoutJob, JobManager
+from media_groups import MediaGroupCache
+from mongodb_database import BroadcastLedgerWriter, ChannelTarget
+from progress import ProgressReporter
 
 logger = logging.getLogger(__name__)
 
+# Telegram accepts at most 100 message IDs per deleteMessages call
+DELETE_BATCH_SIZE = 100
+
 class UserBanManager:
-    def __init__(self, database):
+    def __init__(self, database, fanout: Optional[FanoutEngine] = None,
+                 moderation: Optional[FanoutEngine] = None,
+                 media_groups: Optional[MediaGroupCache] = None):
         self.db = database
-        self.broadcast_messages: Dict[str, Dict] = {}
+        self.fanout = fanout if fanout is not None else FanoutEngine()
+        # Ban/unban are not message sends, so they skip the message rate budget
+        # and are bounded only by concurrency and the server's flood waits
+        self.moderation = moderation if moderation is not None else FanoutEngine(
+            max_concurrency=MODERATION_CONCURRENCY, global_rate=None, per_chat_interval=None
+        )
+        self.jobs = JobManager()
+        self.media_groups = media_groups if media_groups is not None else MediaGroupCache()
     
     async def ban_user_from_all_channels(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: str) -> None:
         """Ban user from all registered channels"""
@@ -21,50 +38,71 @@ class UserBanManager:
                 return
             
             user_id_int = int(user_id)
-            channels = self.db.get_registered_channels()
+            channels = await self.db.get_channel_targets()
             
             if not channels:
                 await update.message.reply_text("❌ No channels registered yet.")
                 return
             
+            status_message = await update.message.reply_text(f"🔨 Banning {user_id_int} from {len(channels)} channels...")
+            progress = ProgressReporter(status_message)
             successful_bans = 0
             failed_bans = 0
-            results: List[str] = []
+            results: List[str] = [''] * len(channels)
+            health = ChannelHealth(self.db, 'ban')
             
-            for channel in channels:
-                channel_id, channel_name, channel_username, _, _, _, _ = channel
+            async def ban_in_channel(indexed_channel: Tuple[int, ChannelTarget]) -> None:
+                nonlocal successful_bans, failed_bans
+                index, channel = indexed_channel
+                channel_id, channel_name = channel
                 
                 try:
-                    await context.bot.ban_chat_member(
+                    await self.moderation.call(
+                        channel_id,
+                        context.bot.ban_chat_member,
                         chat_id=channel_id,
                         user_id=user_id_int
                     )
                     successful_bans += 1
-                    results.append(f"✅ {channel_name} - Banned successfully")
-                    logger.info(f"User {user_id_int} banned from channel {channel_id}")
+                    results[index] = f"✅ {channel_name} - Banned successfully"
+                    health.success(channel_id)
+                    logger.info(f"User {user_id_int} banned from channel {channel_id}", extra={'sample_key': 'ban'})
                     
                 except BadRequest as e:
                     error_msg = str(e).lower()
                     if "user not found" in error_msg:
-                        results.append(f"❌ {channel_name} - User not found in this channel")
+                        results[index] = f"❌ {channel_name} - User not found in this channel"
                     elif "not enough rights" in error_msg:
-                        results.append(f"❌ {channel_name} - Bot doesn't have ban rights")
+                        results[index] = f"❌ {channel_name} - Bot doesn't have ban rights"
                     elif "user is an administrator" in error_msg:
-                        results.append(f"❌ {channel_name} - User is an administrator")
+                        results[index] = f"❌ {channel_name} - User is an administrator"
                     else:
-                        results.append(f"❌ {channel_name} - Error: {str(e)[:50]}...")
+                        results[index] = f"❌ {channel_name} - Error: {str(e)[:50]}..."
                     failed_bans += 1
+                    health.failure(channel_id, e)
                     logger.warning(f"Failed to ban from {channel_id}: {e}")
                     
-                except Forbidden:
-                    results.append(f"❌ {channel_name} - Bot was kicked from channel")
+                except Forbidden as e:
+                    results[index] = f"❌ {channel_name} - Bot was kicked from channel"
+                    health.failure(channel_id, e)
                     failed_bans += 1
                     logger.warning(f"Bot not in channel {channel_id} anymore")
                 
                 except Exception as e:
-                    results.append(f"❌ {channel_name} - Unexpected error")
+                    results[index] = f"❌ {channel_name} - Unexpected error"
                     failed_bans += 1
                     logger.error(f"Unexpected error banning from {channel_id}: {e}")
+                
+                progress.update(
+                    f"🔨 Banning {user_id_int}...\n"
+                    f"✅ Successful: {successful_bans}\n"
+                    f"❌ Failed: {failed_bans}\n"
+                    f"📊 Progress: {successful_bans + failed_bans}/{len(channels)}"
+                )
+            
+            await self.moderation.run(enumerate(channels), ban_in_channel, operation='ban')
+            pruned = await health.flush()
+            logger.info(f"🔨 Ban of {user_id_int}: {successful_bans} succeeded, {failed_bans} failed")
             
             total_channels = len(channels)
             result_message = (
@@ -82,8 +120,9 @@ class UserBanManager:
             
             if len(results) > 15:
                 result_message += f"\n... and {len(results) - 15} more channels"
+            result_message += pruned_note(pruned)
             
-            await update.message.reply_text(result_message)
+            await progress.finish(result_message)
             
         except ValueError:
             await update.message.reply_text("❌ Invalid user ID format. Please provide a valid numeric ID.")
@@ -99,53 +138,74 @@ class UserBanManager:
                 return
             
             user_id_int = int(user_id)
-            channels = self.db.get_registered_channels()
+            channels = await self.db.get_channel_targets()
             
             if not channels:
                 await update.message.reply_text("❌ No channels registered yet.")
                 return
             
+            status_message = await update.message.reply_text(f"🔓 Unbanning {user_id_int} in {len(channels)} channels...")
+            progress = ProgressReporter(status_message)
             successful_unbans = 0
             failed_unbans = 0
-            results: List[str] = []
+            results: List[str] = [''] * len(channels)
+            health = ChannelHealth(self.db, 'unban')
             
-            for channel in channels:
-                channel_id, channel_name, channel_username, _, _, _, _ = channel
+            async def unban_in_channel(indexed_channel: Tuple[int, ChannelTarget]) -> None:
+                nonlocal successful_unbans, failed_unbans
+                index, channel = indexed_channel
+                channel_id, channel_name = channel
                 
                 try:
-                    await context.bot.unban_chat_member(
+                    await self.moderation.call(
+                        channel_id,
+                        context.bot.unban_chat_member,
                         chat_id=channel_id,
                         user_id=user_id_int,
                         only_if_banned=True
                     )
                     successful_unbans += 1
-                    results.append(f"✅ {channel_name} - Unbanned successfully")
-                    logger.info(f"User {user_id_int} unbanned from channel {channel_id}")
+                    results[index] = f"✅ {channel_name} - Unbanned successfully"
+                    health.success(channel_id)
+                    logger.info(f"User {user_id_int} unbanned from channel {channel_id}", extra={'sample_key': 'unban'})
                     
                 except BadRequest as e:
                     error_msg = str(e).lower()
                     if "user not found" in error_msg:
-                        results.append(f"ℹ️ {channel_name} - User not found")
+                        results[index] = f"ℹ️ {channel_name} - User not found"
                     elif "not enough rights" in error_msg:
-                        results.append(f"❌ {channel_name} - Bot doesn't have unban rights")
+                        results[index] = f"❌ {channel_name} - Bot doesn't have unban rights"
                     elif "user not banned" in error_msg:
-                        results.append(f"ℹ️ {channel_name} - User not banned")
+                        results[index] = f"ℹ️ {channel_name} - User not banned"
                     elif "chat not found" in error_msg:
-                        results.append(f"❌ {channel_name} - Chat not found")
+                        results[index] = f"❌ {channel_name} - Chat not found"
                     else:
-                        results.append(f"❌ {channel_name} - Error: {str(e)[:50]}...")
+                        results[index] = f"❌ {channel_name} - Error: {str(e)[:50]}..."
                     failed_unbans += 1
+                    health.failure(channel_id, e)
                     logger.warning(f"Failed to unban from {channel_id}: {e}")
                     
-                except Forbidden:
-                    results.append(f"❌ {channel_name} - Bot was kicked from channel")
+                except Forbidden as e:
+                    results[index] = f"❌ {channel_name} - Bot was kicked from channel"
+                    health.failure(channel_id, e)
                     failed_unbans += 1
                     logger.warning(f"Bot not in channel {channel_id} anymore")
                 
                 except Exception as e:
-                    results.append(f"❌ {channel_name} - Unexpected error")
+                    results[index] = f"❌ {channel_name} - Unexpected error"
                     failed_unbans += 1
                     logger.error(f"Unexpected error unbanning from {channel_id}: {e}")
+                
+                progress.update(
+                    f"🔓 Unbanning {user_id_int}...\n"
+                    f"✅ Successful: {successful_unbans}\n"
+                    f"❌ Failed: {failed_unbans}\n"
+                    f"📊 Progress: {successful_unbans + failed_unbans}/{len(channels)}"
+                )
+            
+            await self.moderation.run(enumerate(channels), unban_in_channel, operation='unban')
+            pruned = await health.flush()
+            logger.info(f"🔓 Unban of {user_id_int}: {successful_unbans} succeeded, {failed_unbans} failed")
             
             total_channels = len(channels)
             result_message = (
@@ -163,8 +223,9 @@ class UserBanManager:
             
             if len(results) > 15:
                 result_message += f"\n... and {len(results) - 15} more channels"
+            result_message += pruned_note(pruned)
             
-            await update.message.reply_text(result_message)
+            await progress.finish(result_message)
             
         except ValueError:
             await update.message.reply_text("❌ Invalid user ID format. Please provide a valid numeric ID.")
@@ -188,149 +249,290 @@ class UserBanManager:
                 return
 
             message_to_broadcast = update.message.reply_to_message
-            channels = self.db.get_registered_channels()
-            
-            if not channels:
-                await update.message.reply_text("❌ No channels registered yet.")
+            # A reply to any item of an album broadcasts the whole album
+            message_ids = self.media_groups.message_ids(message_to_broadcast)
+            # Keyed on the source message, so re-sending /broadcast for it never double-posts
+            broadcast_id = f"broadcast_{message_to_broadcast.chat_id}_{message_ids[0]}"
+            if self.jobs.active(broadcast_id):
+                await update.message.reply_text(f"⚠️ Broadcast `{broadcast_id}` is already running. See /jobs")
                 return
+            
+            created = await self.db.create_broadcast_job(
+                broadcast_id, message_to_broadcast.to_dict(), update.effective_user.id, message_ids
+            )
+            if not created:
+                await update.message.reply_text(
+                    f"♻️ This message was already broadcast as `{broadcast_id}`.\n"
+                    f"Only channels that have not received it will get it now."
+                )
+            
+            await self._start_broadcast_job(
+                update, context, broadcast_id, message_to_broadcast.chat_id, message_ids
+            )
 
-            status_message = await update.message.reply_text("🔄 Starting broadcast...")
-            successful_broadcasts = 0
-            failed_broadcasts = 0
-            broadcast_results: Dict[str, Dict] = {}
+        except Exception as e:
+            logger.error(f"Broadcast error: {e}")
+            await update.message.reply_text("❌ Error during broadcast operation.")
+
+    async def resume_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE, broadcast_id: str) -> None:
+        """Unpause a broadcast that is in flight, or continue one from its checkpoint"""
+        try:
+            if self.jobs.resume(broadcast_id):
+                await update.message.reply_text(f"▶️ Broadcast `{broadcast_id}` resumed.")
+                return
+            if self.jobs.active(broadcast_id):
+                await update.message.reply_text(f"⚠️ Broadcast `{broadcast_id}` is already running. See /jobs")
+                return
             
-            for channel in channels:
-                channel_id, channel_name, channel_username, _, _, _, _ = channel
-                
-                try:
-                    sent_message = await self._send_message_to_channel(context, channel_id, message_to_broadcast)
-                    
-                    successful_broadcasts += 1
-                    broadcast_results[channel_id] = {
-                        'name': channel_name,
-                        'status': 'success',
-                        'message_id': sent_message.message_id
-                    }
-                    
-                    if (successful_broadcasts + failed_broadcasts) % 5 == 0:
-                        await status_message.edit_text(
-                            f"🔄 Broadcasting...\n"
-                            f"✅ Successful: {successful_broadcasts}\n"
-                            f"❌ Failed: {failed_broadcasts}\n"
-                            f"📊 Progress: {successful_broadcasts + failed_broadcasts}/{len(channels)}"
-                        )
-                    
-                    await asyncio.sleep(0.5)
-                    
-                except BadRequest as e:
-                    failed_broadcasts += 1
-                    broadcast_results[channel_id] = {
-                        'name': channel_name,
-                        'status': 'failed',
-                        'reason': f'BadRequest: {str(e)[:50]}'
-                    }
-                except Forbidden:
-                    failed_broadcasts += 1
-                    broadcast_results[channel_id] = {
-                        'name': channel_name,
-                        'status': 'failed',
-                        'reason': 'Bot was kicked from channel'
-                    }
-                except Exception as e:
-                    failed_broadcasts += 1
-                    broadcast_results[channel_id] = {
-                        'name': channel_name,
-                        'status': 'failed',
-                        'reason': f'Unexpected error: {str(e)[:50]}'
-                    }
+            job = await self.db.get_broadcast_job(broadcast_id)
+            if not job:
+                await update.message.reply_text(f"❌ Broadcast `{broadcast_id}` not found.")
+                return
+            
+            source = job['source']
+            # Jobs recorded before albums were supported only stored the source message
+            message_ids = job.get('message_ids') or [source['message_id']]
+            await self._start_broadcast_job(update, context, broadcast_id, source['chat']['id'], message_ids)
+            
+        except Exception as e:
+            logger.error(f"Resume broadcast error: {e}")
+            await update.message.reply_text("❌ Error resuming broadcast.")
 
-            broadcast_id = f"broadcast_{update.message.message_id}"
-            self.broadcast_messages[broadcast_id] = broadcast_results
+    async def pause_job(self, update: Update, context: ContextTypes.DEFAULT_TYPE, job_id: str) -> None:
+        """Pause an in-flight fan-out between channels"""
+        if self.jobs.pause(job_id):
+            await update.message.reply_text(f"⏸️ Job `{job_id}` paused. Use /resume {job_id} to continue.")
+        else:
+            await update.message.reply_text(f"❌ No running job `{job_id}`. See /jobs")
 
-            result_message = (
-                f"📢 Broadcast Completed\n\n"
-                f"📊 Results:\n"
-                f"• Total Channels: {len(channels)}\n"
-                f"• ✅ Successful: {successful_broadcasts}\n"
-                f"• ❌ Failed: {failed_broadcasts}\n\n"
-                f"💾 Broadcast ID: `{broadcast_id}`\n\n"
-                f"To delete this broadcast from all channels, use:\n"
-                f"`/del {broadcast_id}`"
-            )
+    async def cancel_job(self, update: Update, context: ContextTypes.DEFAULT_TYPE, job_id: str) -> None:
+        """Stop an in-flight fan-out; channels already reached stay in the ledger"""
+        if self.jobs.cancel(job_id):
+            await update.message.reply_text(f"🛑 Cancelling job `{job_id}`...")
+        else:
+            await update.message.reply_text(f"❌ No running job `{job_id}`. See /jobs")
 
-            failed_channels = [result for result in broadcast_results.values() if result['status'] == 'failed']
-            if failed_channels:
-                result_message += "\n\n❌ Failed Channels:\n"
-                for i, failed in enumerate(failed_channels[:5], 1):
-                    result_message += f"{i}. {failed['name']} - {failed['reason']}\n"
-                if len(failed_channels) > 5:
-                    result_message += f"... and {len(failed_channels) - 5} more"
+    async def show_jobs(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """List in-flight and recently finished jobs with their progress"""
+        jobs = self.jobs.list()
+        if not jobs:
+            await update.message.reply_text("📭 No broadcast jobs since the bot started.")
+            return
+        
+        message = "📋 Broadcast Jobs:\n\n" + "\n\n".join(job.describe() for job in jobs)
+        message += "\n\n/pause <id> • /resume <id> • /cancel <id>"
+        await update.message.reply_text(message)
 
-            await status_message.edit_text(result_message)
+    async def _start_broadcast_job(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                   broadcast_id: str, from_chat_id: int, message_ids: List[int]) -> None:
+        """Run the fan-out as a background job and return straight away"""
+        async def run(job: FanoutJob) -> None:
+            try:
+                await self._run_broadcast(update, context, broadcast_id, from_chat_id, message_ids, job)
+            except Exception as e:
+                logger.error(f"Broadcast error: {e}")
+                await update.message.reply_text("❌ Error during broadcast operation.")
+                raise
+        
+        try:
+            self.jobs.start(broadcast_id, 'broadcast', run)
+        except ValueError:
+            # Another admin started the same broadcast while this one was being set up
+            await update.message.reply_text(f"⚠️ Broadcast `{broadcast_id}` is already running. See /jobs")
+            return
+        
+        await update.message.reply_text(
+            f"🚀 Broadcast started in the background.\n"
+            f"🆔 Job ID: `{broadcast_id}`\n\n"
+            f"/jobs - Show progress\n"
+            f"/pause {broadcast_id} - Pause\n"
+            f"/cancel {broadcast_id} - Cancel"
+        )
 
-        except Exception as e:
-            logger.error(f"Broadcast error: {e}")
-            await update.message.reply_text("❌ Error during broadcast operation.")
+    async def list_unfinished_broadcasts(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Show broadcasts that can be resumed"""
+        jobs = await self.db.get_unfinished_broadcast_jobs()
+        if not jobs:
+            await update.message.reply_text("✅ No unfinished broadcasts.")
+            return
+        
+        message = "⏸️ Unfinished Broadcasts:\n\n"
+        for job in jobs:
+            message += f"• `{job['_id']}` - {job.get('status')} ({job['created_at'].strftime('%Y-%m-%d %H:%M')})\n"
+        message += "\nUse /resume <broadcast_id> to continue one."
+        await update.message.reply_text(message)
 
-    async def _send_message_to_channel(self, context: ContextTypes.DEFAULT_TYPE, channel_id: str, message) -> Any:
-        """Send message to channel with proper formatting"""
-        if message.text:
-            return await context.bot.send_message(
-                chat_id=channel_id,
-                text=message.text,
-                entities=message.entities,
-                parse_mode=None
+    async def _run_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                             broadcast_id: str, from_chat_id: int, message_ids: List[int],
+                             job: Optional[FanoutJob] = None) -> None:
+        """Fan a message out to every channel with no recorded delivery for broadcast_id.
+        
+        Results are checkpointed to the ledger in batches, so a broadcast cut
+        short by a restart can be resumed without double-posting.
+        """
+        previous_results = await self.db.get_broadcast_results(broadcast_id)
+        already_delivered = {
+            channel_id for channel_id, result in previous_results.items() if result.get('status') == 'success'
+        }
+        all_channels = await self.db.get_channel_targets()
+        channels = [channel for channel in all_channels if channel.channel_id not in already_delivered]
+        
+        if not all_channels:
+            await update.message.reply_text("❌ No channels registered yet.")
+            return
+        if not channels:
+            await self.db.update_broadcast_job(broadcast_id, status='completed')
+            await update.message.reply_text(f"✅ Broadcast `{broadcast_id}` has already reached every channel.")
+            return
+
+        if already_delivered:
+            status_message = await update.message.reply_text(
+                f"🔄 Resuming broadcast ({len(already_delivered)} channels already done)..."
             )
-        elif message.caption:
-            if message.photo:
-                return await context.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=message.photo[-1].file_id,
-                    caption=message.caption,
-                    caption_entities=message.caption_entities,
-                    parse_mode=None
-                )
-            elif message.video:
-                return await context.bot.send_video(
-                    chat_id=channel_id,
-                    video=message.video.file_id,
-                    caption=message.caption,
-                    caption_entities=message.caption_entities,
-                    parse_mode=None
-                )
-            elif message.document:
-                return await context.bot.send_document(
-                    chat_id=channel_id,
-                    document=message.document.file_id,
-                    caption=message.caption,
-                    caption_entities=message.caption_entities,
-                    parse_mode=None
-                )
-            else:
-                return await context.bot.send_message(
-                    chat_id=channel_id,
-                    text=message.caption,
-                    entities=message.caption_entities,
-                    parse_mode=None
-                )
         else:
-            if message.photo:
-                return await context.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=message.photo[-1].file_id
-                )
-            elif message.video:
-                return await context.bot.send_video(
-                    chat_id=channel_id,
-                    video=message.video.file_id
-                )
-            elif message.document:
-                return await context.bot.send_document(
-                    chat_id=channel_id,
-                    document=message.document.file_id
+            status_message = await update.message.reply_text("🔄 Starting broadcast...")
+        await self.db.update_broadcast_job(broadcast_id, status='running', total=len(all_channels))
+        
+        successful_broadcasts = 0
+        failed_broadcasts = 0
+        broadcast_results: Dict[str, Dict] = {}
+        ledger = BroadcastLedgerWriter(self.db, broadcast_id)
+        health = ChannelHealth(self.db, 'broadcast')
+        progress = ProgressReporter(status_message)
+        completed = False
+        if job:
+            job.total = len(channels)
+            job.skipped = len(already_delivered)
+        
+        async def deliver(channel: ChannelTarget) -> None:
+            nonlocal successful_broadcasts, failed_broadcasts
+            channel_id, channel_name = channel
+            
+            try:
+                sent_message_ids = await self.fanout.call(
+                    channel_id, self._copy_to_channel, context, channel_id, from_chat_id, message_ids
                 )
+                
+                successful_broadcasts += 1
+                broadcast_results[channel_id] = {
+                    'name': channel_name,
+                    'status': 'success',
+                    'message_id': sent_message_ids[0],
+                    'message_ids': sent_message_ids
+                }
+                health.success(channel_id)
+                
+            except BadRequest as e:
+                failed_broadcasts += 1
+                health.failure(channel_id, e)
+                broadcast_results[channel_id] = {
+                    'name': channel_name,
+                    'status': 'failed',
+                    'reason': f'BadRequest: {str(e)[:50]}'
+                }
+            except Forbidden as e:
+                failed_broadcasts += 1
+                health.failure(channel_id, e)
+                broadcast_results[channel_id] = {
+                    'name': channel_name,
+                    'status': 'failed',
+                    'reason': 'Bot was kicked from channel'
+                }
+            except Exception as e:
+                failed_broadcasts += 1
+                broadcast_results[channel_id] = {
+                    'name': channel_name,
+                    'status': 'failed',
+                    'reason': f'Unexpected error: {str(e)[:50]}'
+                }
+            
+            await ledger.add(channel_id, broadcast_results[channel_id])
+            if job:
+                job.succeeded, job.failed = successful_broadcasts, failed_broadcasts
+            
+            progress.update(
+                f"🔄 Broadcasting...\n"
+                f"✅ Successful: {successful_broadcasts}\n"
+                f"❌ Failed: {failed_broadcasts}\n"
+                f"📊 Progress: {successful_broadcasts + failed_broadcasts}/{len(channels)}"
+            )
+        
+        try:
+            await self.fanout.run(
+                channels, deliver, operation='broadcast', control=job.control if job else None
+            )
+            completed = True
+        finally:
+            # No progress edits may outlive the fan-out if it raised or was interrupted
+            progress.cancel()
+            # Checkpoint whatever was delivered, even if the fan-out was cut short
+            await ledger.flush()
+            pruned = await health.flush()
+            delivered = len(already_delivered) + successful_broadcasts
+            if job and job.control.cancelled:
+                status = 'cancelled'
             else:
-                raise ValueError("Unsupported message type")
+                status = 'completed' if completed else 'interrupted'
+            await self.db.update_broadcast_job(
+                broadcast_id, status=status, delivered=delivered, failed=failed_broadcasts
+            )
+        
+        logger.info(
+            f"📢 Broadcast {broadcast_id}: {successful_broadcasts} delivered, {failed_broadcasts} failed"
+        )
+
+        cancelled = job is not None and job.control.cancelled
+        result_message = (
+            f"{'🛑 Broadcast Cancelled' if cancelled else '📢 Broadcast Completed'}\n\n"
+            f"📊 Results:\n"
+            f"• Total Channels: {len(channels)}\n"
+            f"• ✅ Successful: {successful_broadcasts}\n"
+            f"• ❌ Failed: {failed_broadcasts}\n"
+        )
+        if already_delivered:
+            result_message += f"• ⏭️ Delivered earlier: {len(already_delivered)}\n"
+        result_message += (
+            f"\n💾 Broadcast ID: `{broadcast_id}`\n\n"
+            f"To delete this broadcast from all channels, use:\n"
+            f"`/del {broadcast_id}`"
+        )
+        if cancelled:
+            result_message += f"\nTo send it to the remaining channels, use:\n`/resume {broadcast_id}`"
+        elif failed_broadcasts:
+            result_message += f"\nTo retry the failed channels, use:\n`/resume {broadcast_id}`"
+        result_message += pruned_note(pruned)
+
+        failed_channels = [result for result in broadcast_results.values() if result['status'] == 'failed']
+        if failed_channels:
+            result_message += "\n\n❌ Failed Channels:\n"
+            for i, failed in enumerate(failed_channels[:5], 1):
+                result_message += f"{i}. {failed['name']} - {failed['reason']}\n"
+            if len(failed_channels) > 5:
+                result_message += f"... and {len(failed_channels) - 5} more"
+
+        await progress.finish(result_message)
+
+    async def _copy_to_channel(self, context: ContextTypes.DEFAULT_TYPE, channel_id: str,
+                               from_chat_id: int, message_ids: List[int]) -> List[int]:
+        """Copy the source message (or album) to a channel and return the new message IDs.
+        
+        Copying keeps every message type, formatting and album grouping, and
+        needs no file re-upload or per-type handling.
+        """
+        if len(message_ids) > 1:
+            copied = await context.bot.copy_messages(
+                chat_id=channel_id,
+                from_chat_id=from_chat_id,
+                message_ids=message_ids
+            )
+            return [message_id.message_id for message_id in copied]
+        
+        copied = await context.bot.copy_message(
+            chat_id=channel_id,
+            from_chat_id=from_chat_id,
+            message_id=message_ids[0]
+        )
+        return [copied.message_id]
 
     async def delete_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Delete broadcasted messages from all channels"""
@@ -338,58 +540,102 @@ class UserBanManager:
             if not context.args:
                 await update.message.reply_text(
                     "🗑️ Delete Broadcast Usage:\n\n"
-                    "/del <broadcast_id> - Delete messages from all channels\n\n"
+                    "/del <broadcast_id> [broadcast_id ...] - Delete messages from all channels\n\n"
                     "Example:\n"
-                    "/del broadcast_123456789\n\n"
+                    "/del broadcast_123456789\n"
+                    "/del broadcast_123456789 broadcast_987654321\n\n"
                     "To get broadcast ID, check the broadcast completion message."
                 )
                 return
 
-            broadcast_id = context.args[0]
+            broadcast_ids = list(dict.fromkeys(context.args))
+            # A running job would keep posting into the channels being cleaned up
+            running = [broadcast_id for broadcast_id in broadcast_ids if self.jobs.active(broadcast_id)]
+            if running:
+                await update.message.reply_text(
+                    "⚠️ Still running: " + ", ".join(f"`{broadcast_id}`" for broadcast_id in running) +
+                    "\n\nUse /cancel <broadcast_id> and wait for it to stop (see /jobs) before deleting."
+                )
+                return
             
-            if broadcast_id not in self.broadcast_messages:
+            found_broadcasts = await self.db.get_many_broadcast_results(broadcast_ids)
+            missing_ids = [broadcast_id for broadcast_id in broadcast_ids if broadcast_id not in found_broadcasts]
+            
+            if not found_broadcasts:
                 await update.message.reply_text("❌ Broadcast ID not found or already deleted.")
                 return
 
-            broadcast_results = self.broadcast_messages[broadcast_id]
+            # Group message IDs per channel so one call removes all of them
+            targets: Dict[str, List[int]] = {}
+            for broadcast_results in found_broadcasts.values():
+                for channel_id, channel_data in broadcast_results.items():
+                    if channel_data['status'] == 'success':
+                        # Records from before album support only carry message_id
+                        targets.setdefault(channel_id, []).extend(
+                            channel_data.get('message_ids') or [channel_data['message_id']]
+                        )
+            total_messages = sum(len(message_ids) for message_ids in targets.values())
+
             status_message = await update.message.reply_text("🔄 Starting deletion...")
+            progress = ProgressReporter(status_message)
 
             successful_deletes = 0
             failed_deletes = 0
+            health = ChannelHealth(self.db, 'delete')
+
+            async def delete_in_channel(target: Tuple[str, List[int]]) -> None:
+                nonlocal successful_deletes, failed_deletes
+                channel_id, message_ids = target
 
-            for channel_id, channel_data in broadcast_results.items():
-                if channel_data['status'] == 'success':
+                for start in range(0, len(message_ids), DELETE_BATCH_SIZE):
+                    chunk = message_ids[start:start + DELETE_BATCH_SIZE]
                     try:
-                        await context.bot.delete_message(
-                            chat_id=channel_id,
-                            message_id=channel_data['message_id']
-                        )
-                        successful_deletes += 1
+                        if len(chunk) == 1:
+                            await self.fanout.call(
+                                channel_id, context.bot.delete_message,
+                                chat_id=channel_id, message_id=chunk[0]
+                            )
+                        else:
+                            await self.fanout.call(
+                                channel_id, context.bot.delete_messages,
+                                chat_id=channel_id, message_ids=chunk
+                            )
+                        successful_deletes += len(chunk)
+                        health.success(channel_id)
                     except Exception as e:
-                        failed_deletes += 1
+                        failed_deletes += len(chunk)
+                        if health.failure(channel_id, e):
+                            # The remaining chunks cannot reach the channel either
+                            failed_deletes += len(message_ids) - start - len(chunk)
+                            logger.warning(f"Channel {channel_id} is unreachable, skipping its deletes")
+                            break
                         logger.error(f"Delete error in {channel_id}: {e}")
 
-                    if (successful_deletes + failed_deletes) % 5 == 0:
-                        await status_message.edit_text(
-                            f"🔄 Deleting...\n"
-                            f"✅ Successful: {successful_deletes}\n"
-                            f"❌ Failed: {failed_deletes}\n"
-                            f"📊 Progress: {successful_deletes + failed_deletes}/{len(broadcast_results)}"
-                        )
+                progress.update(
+                    f"🔄 Deleting...\n"
+                    f"✅ Successful: {successful_deletes}\n"
+                    f"❌ Failed: {failed_deletes}\n"
+                    f"📊 Progress: {successful_deletes + failed_deletes}/{total_messages}"
+                )
 
-                    await asyncio.sleep(0.3)
+            await self.fanout.run(targets.items(), delete_in_channel, operation='delete')
+            pruned = await health.flush()
 
-            del self.broadcast_messages[broadcast_id]
+            await self.db.delete_broadcast_results(list(found_broadcasts))
 
             result_message = (
                 f"🗑️ Deletion Completed\n\n"
                 f"📊 Results:\n"
-                f"• Total Messages: {len(broadcast_results)}\n"
+                f"• Broadcasts: {len(found_broadcasts)}\n"
+                f"• Total Messages: {total_messages}\n"
                 f"• ✅ Successful Deletes: {successful_deletes}\n"
                 f"• ❌ Failed Deletes: {failed_deletes}"
             )
+            if missing_ids:
+                result_message += f"\n\n⚠️ Not found: {', '.join(missing_ids)}"
+            result_message += pruned_note(pruned)
 
-            await status_message.edit_text(result_message)
+            await progress.finish(result_message)
 
         except Exception as e:
             logger.error(f"Delete broadcast error: {e}")
@@ -412,9 +658,6 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         user_id = context.args[0]
         bot_instance = context.bot_data['bot_instance']
         
-        if not hasattr(bot_instance, 'ban_manager'):
-            bot_instance.ban_manager = UserBanManager(bot_instance.db)
-        
         await bot_instance.ban_manager.ban_user_from_all_channels(update, context, user_id)
         
     except Exception as e:
@@ -438,9 +681,6 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         user_id = context.args[0]
         bot_instance = context.bot_data['bot_instance']
         
-        if not hasattr(bot_instance, 'ban_manager'):
-            bot_instance.ban_manager = UserBanManager(bot_instance.db)
-        
         await bot_instance.ban_manager.unban_user_from_all_channels(update, context, user_id)
         
     except Exception as e:
@@ -452,23 +692,73 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     try:
         bot_instance = context.bot_data['bot_instance']
         
-        if not hasattr(bot_instance, 'ban_manager'):
-            bot_instance.ban_manager = UserBanManager(bot_instance.db)
-        
         await bot_instance.ban_manager.broadcast_message(update, context)
         
     except Exception as e:
         logger.error(f"Broadcast command error: {e}")
         await update.message.reply_text("❌ Error processing broadcast command.")
 
+async def resume_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /resume command"""
+    try:
+        bot_instance = context.bot_data['bot_instance']
+        
+        if not context.args:
+            await bot_instance.ban_manager.list_unfinished_broadcasts(update, context)
+            return
+        
+        await bot_instance.ban_manager.resume_broadcast(update, context, context.args[0])
+        
+    except Exception as e:
+        logger.error(f"Resume command error: {e}")
+        await update.message.reply_text("❌ Error processing resume command.")
+
+async def jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /jobs command"""
+    try:
+        bot_instance = context.bot_data['bot_instance']
+        
+        await bot_instance.ban_manager.show_jobs(update, context)
+        
+    except Exception as e:
+        logger.error(f"Jobs command error: {e}")
+        await update.message.reply_text("❌ Error processing jobs command.")
+
+async def pause_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /pause command"""
+    try:
+        if not context.args:
+            await update.message.reply_text("⏸️ Usage: /pause <job_id>\n\nSee /jobs for running jobs.")
+            return
+        
+        bot_instance = context.bot_data['bot_instance']
+        
+        await bot_instance.ban_manager.pause_job(update, context, context.args[0])
+        
+    except Exception as e:
+        logger.error(f"Pause command error: {e}")
+        await update.message.reply_text("❌ Error processing pause command.")
+
+async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /cancel command"""
+    try:
+        if not context.args:
+            await update.message.reply_text("🛑 Usage: /cancel <job_id>\n\nSee /jobs for running jobs.")
+            return
+        
+        bot_instance = context.bot_data['bot_instance']
+        
+        await bot_instance.ban_manager.cancel_job(update, context, context.args[0])
+        
+    except Exception as e:
+        logger.error(f"Cancel command error: {e}")
+        await update.message.reply_text("❌ Error processing cancel command.")
+
 async def delete_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /del command"""
     try:
         bot_instance = context.bot_data['bot_instance']
         
-        if not hasattr(bot_instance, 'ban_manager'):
-            bot_instance.ban_manager = UserBanManager(bot_instance.db)
-        
         await bot_instance.ban_manager.delete_broadcast(update, context)
         
     except Exception as e:
@@ -0,0 +1,231 @@
+# benchmarks/bench_database.py - Timings of the MongoDBDatabase hot paths at 1k/10k/100k channels
+#
+# Run from the repository root against a throwaway database:
+#   python -m benchmarks.bench_database --mongodb-url mongodb://localhost:27017 --json bench.json
+# or without a server (slower, and no indexes are really used):
+#   python -m benchmarks.bench_database --mongomock --sizes 1000
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import pymongo
+from pymongo import MongoClient
+
+from mongodb_database import MongoDBDatabase
+
+logger = logging.getLogger(__name__)
+
+BENCH_DB_NAME = 'channel_bot_bench'
+CHANNEL_ID_BASE = -1002000000000
+SEED_BATCH_SIZE = 5000
+
+def _channel_id(index: int) -> int:
+    return CHANNEL_ID_BASE - index
+
+def seed(db: MongoDBDatabase, channel_count: int, days: int, samples_per_day: int) -> Dict[str, Any]:
+    """Fill the channels and member_count_buckets collections directly with insert_many"""
+    started = time.perf_counter()
+    now = datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    rng = random.Random(channel_count)
+
+    channels: List[Dict[str, Any]] = []
+    buckets: List[Dict[str, Any]] = []
+    bucket_count = 0
+
+    def flush(force: bool = False) -> None:
+        if channels and (force or len(channels) >= SEED_BATCH_SIZE):
+            db.channels.insert_many(channels, ordered=False)
+            channels.clear()
+        if buckets and (force or len(buckets) >= SEED_BATCH_SIZE):
+            db.member_buckets.insert_many(buckets, ordered=False)
+            buckets.clear()
+
+    for index in range(channel_count):
+        members = rng.randint(100, 100000)
+        registered = now - timedelta(days=days, seconds=index)
+        channels.append({
+            'channel_id': str(_channel_id(index)),
+            'channel_name': f"Bench Channel {index}",
+            'channel_username': f"bench_{index}",
+            'registered_date': registered,
+            'forward_count': rng.randint(0, 500),
+            'last_activity': now - timedelta(minutes=rng.randint(0, 10000)),
+            'current_members': members,
+            'is_active': index % 20 != 0
+        })
+
+        count = members
+        for day_offset in range(days, -1, -1):
+            day = today - timedelta(days=day_offset)
+            samples = []
+            hours: Dict[str, int] = {}
+            for sample in range(samples_per_day):
+                count = max(0, count + rng.randint(-20, 30))
+                at = day + timedelta(seconds=sample * 86400 // samples_per_day)
+                samples.append({'t': at, 'c': count})
+                hours[f"{at.hour:02d}"] = count
+            counts = [s['c'] for s in samples] or [count]
+            buckets.append({
+                'channel_id': str(_channel_id(index)),
+                'day': day,
+                'samples': samples,
+                'sample_count': len(samples),
+                'open': counts[0],
+                'close': counts[-1],
+                'min': min(counts),
+                'max': max(counts),
+                'hours': hours,
+                'updated_at': day + timedelta(hours=23)
+            })
+            bucket_count += 1
+        flush()
+    flush(force=True)
+
+    return {
+        'channels': channel_count,
+        'buckets': bucket_count,
+        'member_samples': bucket_count * samples_per_day,
+        'seed_time_s': round(time.perf_counter() - started, 3)
+    }
+
+def measure(name: str, iterations: int, func: Callable[[int], Any],
+            before: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Call func(i) iterations times and summarise the latencies"""
+    timings: List[float] = []
+    for i in range(iterations):
+        if before:
+            before()
+        started = time.perf_counter()
+        func(i)
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    def pct(fraction: float) -> float:
+        return round(timings[min(len(timings) - 1, int(round(fraction * (len(timings) - 1))))] * 1000, 3)
+    total = sum(timings)
+    return {
+        'operation': name,
+        'iterations': iterations,
+        'mean_ms': round(total / iterations * 1000, 3),
+        'p50_ms': pct(0.50),
+        'p99_ms': pct(0.99),
+        'min_ms': round(timings[0] * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+        'ops_per_s': round(iterations / total, 1) if total else 0.0
+    }
+
+def run_size(client: MongoClient, db_name: str, channel_count: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Seed a fresh database with channel_count channels and time every operation"""
+    client.drop_database(db_name)
+    db = MongoDBDatabase(client=client, db_name=db_name)
+    try:
+        seeded = seed(db, channel_count, args.days, args.samples_per_day)
+        print(
+            f"{channel_count:>7} seeded {seeded['buckets']} buckets / "
+            f"{seeded['member_samples']} samples in {seeded['seed_time_s']}s"
+        )
+        rng = random.Random(args.seed)
+        existing = [_channel_id(rng.randrange(channel_count)) for _ in range(args.iterations)]
+        listing_iterations = max(1, min(args.iterations, args.listing_iterations))
+
+        operations = [
+            measure('get_registered_channels (cold)', listing_iterations,
+                    lambda i: db.get_registered_channels(), before=db.channel_cache.invalidate),
+            measure('get_registered_channels (cached)', args.iterations,
+                    lambda i: db.get_registered_channels()),
+            measure('register_channel (new)', args.iterations,
+                    lambda i: db.register_channel(_channel_id(channel_count + i), f"New {i}", None)),
+            measure('register_channel (existing, cached)', args.iterations,
+                    lambda i: db.register_channel(existing[i], None, None)),
+            measure('register_channel (existing, cold)', args.iterations,
+                    lambda i: db.register_channel(existing[i], None, None), before=db.channel_cache.invalidate),
+            measure('update_channel_member_count', args.iterations,
+                    lambda i: db.update_channel_member_count(existing[i], 5000 + i)),
+            measure('get_today_growth', args.iterations,
+                    lambda i: db.get_today_growth(existing[i])),
+            measure('get_stats', args.iterations,
+                    lambda i: db.get_stats()),
+            measure('reconcile_stats (aggregation)', listing_iterations,
+                    lambda i: db.reconcile_stats()),
+        ]
+        db.flush_activity()
+        for result in operations:
+            result['channels'] = channel_count
+            print(
+                f"{channel_count:>7} {result['operation']:<38} mean {result['mean_ms']:>9.3f}ms  "
+                f"p50 {result['p50_ms']:>9.3f}ms  p99 {result['p99_ms']:>9.3f}ms  {result['ops_per_s']:>9.1f}/s"
+            )
+        return {'seed': seeded, 'operations': operations}
+    finally:
+        if not args.keep:
+            client.drop_database(db_name)
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def make_client(args: argparse.Namespace) -> MongoClient:
+    if args.mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("--mongomock needs the mongomock package (pip install mongomock)")
+        return mongomock.MongoClient()
+    return MongoClient(args.mongodb_url)
+
+def main(args: argparse.Namespace) -> None:
+    if args.db_name == 'channel_bot_db':
+        raise SystemExit("Refusing to benchmark against the bot's own database; pick another --db-name")
+
+    client = make_client(args)
+    runs = []
+    for channel_count in args.sizes:
+        runs.append(run_size(client, args.db_name, channel_count, args))
+
+    if args.json:
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'revision': _git_revision(),
+            'backend': 'mongomock' if args.mongomock else 'mongod',
+            'python': platform.python_version(),
+            'pymongo': pymongo.version,
+            'config': {
+                'days': args.days, 'samples_per_day': args.samples_per_day,
+                'iterations': args.iterations, 'seed': args.seed
+            },
+            'runs': runs
+        }
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"Results written to {args.json}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark MongoDBDatabase operations at scale")
+    parser.add_argument('--mongodb-url', default='mongodb://localhost:27017')
+    parser.add_argument('--mongomock', action='store_true', help="use an in-process mongomock client")
+    parser.add_argument('--db-name', default=BENCH_DB_NAME)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--days', type=int, default=14, help="days of member-count buckets per channel")
+    parser.add_argument('--samples-per-day', type=int, default=24)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--listing-iterations', type=int, default=20,
+                        help="iterations for whole-collection reads")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help="leave the seeded database in place")
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.CRITICAL)
+    main(parse_args())
@@ -0,0 +1,130 @@
+# dead_channels.py - Takes channels the bot can no longer reach out of fan-outs
+import logging
+import os
+from typing import Dict, List, Set
+
+from telegram import Update
+from telegram.error import BadRequest, Forbidden
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+# Fan-outs in a row that must fail to reach a channel before it is deactivated
+DEAD_CHANNEL_THRESHOLD = int(os.getenv('DEAD_CHANNEL_THRESHOLD', '3'))
+# Channels listed per section of the /dead report
+DEAD_REPORT_LIMIT = int(os.getenv('DEAD_REPORT_LIMIT', '20'))
+
+def is_terminal_error(error: Exception) -> bool:
+    """Whether error means the bot cannot reach the channel at all (kicked, or the chat is gone)"""
+    if isinstance(error, Forbidden):
+        return True
+    return isinstance(error, BadRequest) and 'chat not found' in str(error).lower()
+
+class ChannelHealth:
+    """Per-channel outcomes of one fan-out, written back with flush().
+
+    Only terminal errors count against a channel and any success clears its
+    score, so flood waits, timeouts or a missing permission never prune it.
+    """
+    def __init__(self, database, operation: str, threshold: int = DEAD_CHANNEL_THRESHOLD) -> None:
+        self.db = database
+        self.operation = operation
+        self.threshold = max(1, threshold)
+        self.failures: Dict[str, str] = {}
+        self.successes: Set[str] = set()
+
+    def success(self, channel_id: str) -> None:
+        self.successes.add(channel_id)
+
+    def failure(self, channel_id: str, error: Exception) -> bool:
+        """Record an error; returns True if it is terminal"""
+        if not is_terminal_error(error):
+            return False
+        self.failures[channel_id] = f"{type(error).__name__}: {str(error)[:100]}"
+        return True
+
+    async def flush(self) -> List[str]:
+        """Store the scores and return the channels deactivated as dead"""
+        if not self.failures and not self.successes:
+            return []
+        try:
+            pruned = await self.db.record_channel_health(self.failures, list(self.successes), self.threshold)
+        except Exception as e:
+            logger.error(f"❌ Channel health update error after {self.operation}: {e}")
+            return []
+
+        if pruned:
+            logger.warning(f"🧹 {len(pruned)} dead channels deactivated after {self.operation}")
+        return pruned
+
+def pruned_note(pruned: List[str]) -> str:
+    """Line appended to a fan-out's result message"""
+    if not pruned:
+        return ""
+    return f"\n\n🧹 {len(pruned)} unreachable channels were deactivated. See /dead"
+
+async def dead_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /dead command: deactivated and failing channels"""
+    try:
+        bot_instance = context.bot_data['bot_instance']
+        dead = await bot_instance.db.get_dead_channels(DEAD_REPORT_LIMIT)
+        failing = await bot_instance.db.get_failing_channels(DEAD_REPORT_LIMIT)
+
+        if not dead and not failing:
+            await update.message.reply_text("✅ No dead or failing channels.")
+            return
+
+        message = "💀 Dead Channels Report\n\n"
+        if dead:
+            message += "🚫 Deactivated:\n"
+            for i, channel in enumerate(dead, 1):
+                deactivated_at = channel.get('deactivated_at')
+                when = deactivated_at.strftime('%Y-%m-%d %H:%M') if deactivated_at else '?'
+                message += (
+                    f"{i}. {channel.get('channel_name') or 'Unknown'} (`{channel['channel_id']}`)\n"
+                    f"   {when} - {(channel.get('deactivated_reason') or 'manual')[:60]}\n"
+                )
+            message += "\n"
+        if failing:
+            message += "⚠️ Failing (still active):\n"
+            for i, channel in enumerate(failing, 1):
+                message += (
+                    f"{i}. {channel.get('channel_name') or 'Unknown'} (`{channel['channel_id']}`)\n"
+                    f"   {channel['failure_score']}/{DEAD_CHANNEL_THRESHOLD} - "
+                    f"{(channel.get('last_failure_reason') or '')[:60]}\n"
+                )
+            message += "\n"
+        message += "/reactivate <channel_id> [...] or /reactivate all"
+
+        await update.message.reply_text(message)
+
+    except Exception as e:
+        logger.error(f"Dead channels command error: {e}")
+        await update.message.reply_text("❌ Error getting dead channels.")
+
+async def reactivate_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /reactivate command"""
+    try:
+        if not context.args:
+            await update.message.reply_text(
+                "♻️ Reactivate Command Usage:\n\n"
+                "/reactivate <channel_id> [...] - Put channels back into fan-outs\n"
+                "/reactivate all - Reactivate every channel deactivated as dead\n\n"
+                "Example:\n"
+                "/reactivate -1001234567890\n\n"
+                "Note: Add the bot back to the channel first, or it will be pruned again."
+            )
+            return
+
+        bot_instance = context.bot_data['bot_instance']
+        channel_ids = None if context.args[0].lower() == 'all' else context.args
+        reactivated = await bot_instance.db.reactivate_channels(channel_ids)
+
+        if reactivated:
+            await update.message.reply_text(f"♻️ {reactivated} channels reactivated.")
+        else:
+            await update.message.reply_text("❌ No matching deactivated channels. See /dead")
+
+    except Exception as e:
+        logger.error(f"Reactivate command error: {e}")
+        await update.message.reply_text("❌ Error reactivating channels.")
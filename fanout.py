@@ -0,0 +1,150 @@
+# fanout.py - Rate-limited concurrent fan-out of Telegram calls across channels
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, TypeVar
+
+from telegram.error import RetryAfter
+
+from metrics import FanoutProgress
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Telegram allows roughly 30 messages/s per bot and about 1 message/s per chat.
+# Defaults stay a little under those limits to leave room for status edits.
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '20'))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))
+TELEGRAM_PER_CHAT_INTERVAL = float(os.getenv('TELEGRAM_PER_CHAT_INTERVAL', '1.0'))
+FANOUT_MAX_RETRIES = int(os.getenv('FANOUT_MAX_RETRIES', '3'))
+# Parallel ban/unban calls across the channel network
+MODERATION_CONCURRENCY = int(os.getenv('MODERATION_CONCURRENCY', '50'))
+
+class TokenBucket:
+    """Async token bucket refilled at `rate` tokens per second"""
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class PerChatLimiter:
+    """Keeps calls to the same chat at least `interval` seconds apart"""
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._next_slot: Dict[Any, float] = {}
+
+    async def acquire(self, chat_id: Any) -> None:
+        """Reserve the next free slot for chat_id and wait for it"""
+        now = time.monotonic()
+        if len(self._next_slot) > 10000:
+            self._next_slot = {key: slot for key, slot in self._next_slot.items() if slot > now}
+
+        slot = max(now, self._next_slot.get(chat_id, 0.0))
+        self._next_slot[chat_id] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class FanoutControl:
+    """Pause/cancel switch shared by a running fan-out and whoever manages it"""
+    def __init__(self) -> None:
+        self._running = asyncio.Event()
+        self._running.set()
+        self.cancelled = False
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set() and not self.cancelled
+
+    def pause(self) -> None:
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def cancel(self) -> None:
+        """Stop handing out new items; calls already in flight still finish"""
+        self.cancelled = True
+        self._running.set()
+
+    async def wait(self) -> bool:
+        """Block while paused; False once the fan-out has been cancelled"""
+        await self._running.wait()
+        return not self.cancelled
+
+class FanoutEngine:
+    """Runs one Telegram call per target with bounded concurrency.
+
+    Every call passes through the shared global token bucket and the per-chat
+    limiter. A RetryAfter only pauses the call that received it; the other
+    workers keep going.
+    """
+    def __init__(self, max_concurrency: int = BROADCAST_CONCURRENCY,
+                 global_rate: Optional[float] = TELEGRAM_GLOBAL_RATE,
+                 per_chat_interval: Optional[float] = TELEGRAM_PER_CHAT_INTERVAL,
+                 max_retries: int = FANOUT_MAX_RETRIES) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.bucket: Optional[TokenBucket] = TokenBucket(global_rate) if global_rate else None
+        self.per_chat: Optional[PerChatLimiter] = PerChatLimiter(per_chat_interval) if per_chat_interval else None
+        self.max_retries = max_retries
+
+    async def call(self, chat_id: Any, func: Callable[..., Awaitable[T]], /, *args: Any, **kwargs: Any) -> T:
+        """Rate-limit and run a single call, retrying after flood waits"""
+        attempt = 0
+        while True:
+            if self.per_chat:
+                await self.per_chat.acquire(chat_id)
+            if self.bucket:
+                await self.bucket.acquire()
+
+            try:
+                return await func(*args, **kwargs)
+            except RetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(
+                    f"⏳ Flood wait for {chat_id}: retrying in {e.retry_after}s "
+                    f"(attempt {attempt}/{self.max_retries})"
+                )
+                await asyncio.sleep(float(e.retry_after))
+
+    async def run(self, items: Iterable[T], worker: Callable[[T], Awaitable[Any]],
+                  operation: str = 'fanout', control: Optional[FanoutControl] = None) -> None:
+        """Feed items to at most max_concurrency concurrent workers.
+
+        operation labels the throughput metrics of this run; control lets the
+        caller pause or cancel it between items.
+        """
+        iterator = iter(items)
+        progress = FanoutProgress(operation)
+
+        async def consume() -> None:
+            for item in iterator:
+                if control and not await control.wait():
+                    break
+                try:
+                    await worker(item)
+                except Exception as e:
+                    logger.error(f"Fan-out worker error: {e}")
+                progress.item_done()
+
+        try:
+            await asyncio.gather(*(consume() for _ in range(self.max_concurrency)))
+        finally:
+            progress.finish()
@@ -0,0 +1,155 @@
+# jobs.py - Background fan-out jobs with pause, cancel and in-memory progress
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fanout import FanoutControl
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept in memory for /jobs
+FINISHED_JOBS_KEPT = int(os.getenv('FINISHED_JOBS_KEPT', '20'))
+
+STATE_ICONS = {
+    'running': '▶️',
+    'paused': '⏸️',
+    'cancelling': '🛑',
+    'cancelled': '🛑',
+    'interrupted': '⚡',
+    'completed': '✅',
+    'failed': '❌'
+}
+
+class FanoutJob:
+    """Progress and controls of one background fan-out"""
+    def __init__(self, job_id: str, kind: str) -> None:
+        self.job_id = job_id
+        self.kind = kind
+        self.control = FanoutControl()
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def finished(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    @property
+    def state(self) -> str:
+        if self.finished:
+            if self.error:
+                return 'failed'
+            if self.task.cancelled():
+                return 'interrupted'
+            return 'cancelled' if self.control.cancelled else 'completed'
+        if self.control.cancelled:
+            return 'cancelling'
+        return 'paused' if self.control.paused else 'running'
+
+    def describe(self) -> str:
+        """One status line for /jobs"""
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        line = (
+            f"{STATE_ICONS.get(self.state, '•')} `{self.job_id}` - {self.state}\n"
+            f"   📊 {self.done}/{self.total}  ✅ {self.succeeded}  ❌ {self.failed}  ⏱️ {int(elapsed)}s"
+        )
+        if self.skipped:
+            line += f"  ⏭️ {self.skipped} done earlier"
+        if self.error:
+            line += f"\n   ⚠️ {self.error[:80]}"
+        return line
+
+class JobManager:
+    """Runs fan-outs as asyncio tasks so handlers can return immediately"""
+    def __init__(self, finished_kept: int = FINISHED_JOBS_KEPT) -> None:
+        self.finished_kept = finished_kept
+        self._jobs: Dict[str, FanoutJob] = {}
+
+    def active(self, job_id: str) -> Optional[FanoutJob]:
+        """The job if it is still running or paused"""
+        job = self._jobs.get(job_id)
+        return job if job and not job.finished else None
+
+    def list(self) -> List[FanoutJob]:
+        """Unfinished jobs first, then the most recent finished ones"""
+        jobs = list(self._jobs.values())
+        return [job for job in jobs if not job.finished] + [job for job in reversed(jobs) if job.finished]
+
+    def start(self, job_id: str, kind: str, run: Callable[[FanoutJob], Awaitable[None]]) -> FanoutJob:
+        """Start run(job) in the background under job_id"""
+        if self.active(job_id):
+            raise ValueError(f"Job {job_id} is already running")
+
+        job = FanoutJob(job_id, kind)
+        self._jobs.pop(job_id, None)
+        self._jobs[job_id] = job
+
+        async def runner() -> None:
+            try:
+                await run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.error = str(e)
+                logger.error(f"❌ Job {job_id} failed: {e}")
+            finally:
+                job.finished_at = time.monotonic()
+                self._prune()
+
+        job.task = asyncio.create_task(runner(), name=f"job:{job_id}")
+        logger.info(f"🚀 Job {job_id} started ({kind})")
+        return job
+
+    def pause(self, job_id: str) -> bool:
+        job = self.active(job_id)
+        if not job or job.control.cancelled:
+            return False
+        job.control.pause()
+        logger.info(f"⏸️ Job {job_id} paused")
+        return True
+
+    def resume(self, job_id: str) -> bool:
+        job = self.active(job_id)
+        if not job or not job.control.paused:
+            return False
+        job.control.resume()
+        logger.info(f"▶️ Job {job_id} resumed")
+        return True
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.active(job_id)
+        if not job:
+            return False
+        job.control.cancel()
+        logger.info(f"🛑 Job {job_id} cancelled")
+        return True
+
+    async def join(self) -> None:
+        """Wait for every unfinished job"""
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        """Interrupt unfinished jobs so they checkpoint before the process exits"""
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:-self.finished_kept or None]:
+            del self._jobs[job_id]
@@ -0,0 +1,172 @@
+# loadtest/fake_bot_api.py - Local stand-in for the Telegram Bot API used by the load tests
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Simulated channels get IDs CHANNEL_ID_BASE - 0, CHANNEL_ID_BASE - 1, ...
+CHANNEL_ID_BASE = -1001000000000
+
+class FakeTelegram:
+    """Simulated Bot API state and failure behaviour.
+
+    - latency_ms/jitter_ms: delay added to every call
+    - rate_limit: calls per second before 429s are returned (0 disables)
+    - flood_probability: chance of a random 429 on any fan-out call
+    - kicked_every / missing_every: every Nth channel answers 403 Forbidden
+      or 400 chat not found
+    """
+    def __init__(self, latency_ms: float = 40.0, jitter_ms: float = 20.0, rate_limit: float = 0,
+                 flood_probability: float = 0.0, retry_after: int = 1,
+                 kicked_every: int = 0, missing_every: int = 0, seed: int = 1) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.flood_probability = flood_probability
+        self.retry_after = retry_after
+        self.kicked_every = kicked_every
+        self.missing_every = missing_every
+        self.random = random.Random(seed)
+        self._recent_calls: Deque[float] = deque()
+        self._next_message_id = 1
+        self.calls: Dict[str, int] = {}
+
+    @staticmethod
+    def channel_id(index: int) -> int:
+        return CHANNEL_ID_BASE - index
+
+    def _channel_index(self, chat_id: Any) -> Optional[int]:
+        try:
+            index = CHANNEL_ID_BASE - int(chat_id)
+        except (TypeError, ValueError):
+            return None
+        return index if index >= 0 else None
+
+    def _message(self, chat_id: Any, text: str = '') -> Dict[str, Any]:
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        chat_type = 'channel' if self._channel_index(chat_id) is not None else 'private'
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': chat_type},
+            'text': text
+        }
+
+    def _throttled(self) -> bool:
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        while self._recent_calls and now - self._recent_calls[0] > 1.0:
+            self._recent_calls.popleft()
+        if len(self._recent_calls) >= self.rate_limit:
+            return True
+        self._recent_calls.append(now)
+        return False
+
+    async def handle(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one Bot API call the way Telegram would"""
+        self.calls[method] = self.calls.get(method, 0) + 1
+        delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        if method == 'getMe':
+            return _ok({'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'})
+
+        chat_id = params.get('chat_id')
+        index = self._channel_index(chat_id)
+
+        if index is not None:
+            if self._throttled() or self.random.random() < self.flood_probability:
+                return {
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f"Too Many Requests: retry after {self.retry_after}",
+                    'parameters': {'retry_after': self.retry_after}
+                }
+            if self.kicked_every and index % self.kicked_every == self.kicked_every - 1:
+                return _error(403, "Forbidden: bot was kicked from the channel chat")
+            if self.missing_every and index % self.missing_every == self.missing_every - 1:
+                return _error(400, "Bad Request: chat not found")
+
+        if method in ('sendMessage', 'sendPhoto', 'sendVideo', 'sendDocument', 'editMessageText'):
+            return _ok(self._message(chat_id, params.get('text', '')))
+        if method == 'copyMessage':
+            return _ok({'message_id': self._message(chat_id)['message_id']})
+        if method == 'copyMessages':
+            message_ids = json.loads(params.get('message_ids', '[]'))
+            return _ok([{'message_id': self._message(chat_id)['message_id']} for _ in message_ids])
+        if method in ('banChatMember', 'unbanChatMember', 'deleteMessage', 'deleteMessages',
+                      'setWebhook', 'deleteWebhook'):
+            return _ok(True)
+        if method == 'getChatMemberCount':
+            return _ok(1000 + (index or 0))
+        return _error(404, f"Not Found: method {method} not simulated")
+
+def _ok(result: Any) -> Dict[str, Any]:
+    return {'ok': True, 'result': result}
+
+def _error(code: int, description: str) -> Dict[str, Any]:
+    return {'ok': False, 'error_code': code, 'description': description}
+
+class BotApiHandler(tornado.web.RequestHandler):
+    def initialize(self, telegram: FakeTelegram) -> None:
+        self.telegram = telegram
+
+    async def post(self, token: str, method: str) -> None:
+        params: Dict[str, Any] = {key: self.get_body_argument(key) for key in self.request.body_arguments}
+        if self.request.headers.get('Content-Type', '').startswith('application/json') and self.request.body:
+            params.update(json.loads(self.request.body))
+
+        response = await self.telegram.handle(method, params)
+        self.set_status(200 if response['ok'] else response['error_code'])
+        self.set_header('Content-Type', 'application/json')
+        self.write(json.dumps(response))
+
+    get = post
+
+def make_app(telegram: FakeTelegram) -> tornado.web.Application:
+    return tornado.web.Application([
+        (r'/bot([^/]+)/(\w+)', BotApiHandler, {'telegram': telegram}),
+    ])
+
+def start_server(telegram: FakeTelegram, port: int = 8081) -> HTTPServer:
+    """Start the fake API on the running event loop"""
+    server = HTTPServer(make_app(telegram))
+    server.listen(port, address='127.0.0.1')
+    logger.info(f"🧪 Fake Bot API listening on http://127.0.0.1:{port}/bot")
+    return server
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    telegram = FakeTelegram(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+        flood_probability=args.flood_probability, retry_after=args.retry_after,
+        kicked_every=args.kicked_every, missing_every=args.missing_every
+    )
+    start_server(telegram, args.port)
+    await asyncio.Event().wait()
+
+def add_simulation_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency-ms', type=float, default=40.0)
+    parser.add_argument('--jitter-ms', type=float, default=20.0)
+    parser.add_argument('--rate-limit', type=float, default=0, help="calls/s before 429s (0 = off)")
+    parser.add_argument('--flood-probability', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--kicked-every', type=int, default=0, help="every Nth channel has kicked the bot")
+    parser.add_argument('--missing-every', type=int, default=0, help="every Nth channel no longer exists")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run a fake Telegram Bot API server")
+    parser.add_argument('--port', type=int, default=8081)
+    add_simulation_arguments(parser)
+    asyncio.run(_serve_forever(parser.parse_args()))
@@ -0,0 +1,241 @@
+# loadtest/harness.py - Fan-out load test of broadcast, ban, unban and delete against the fake Bot API
+#
+# Run from the repository root:
+#   python -m loadtest.harness --sizes 100 1000 10000 --json results.json
+# Add --rate-limit / --flood-probability / --kicked-every to simulate a hostile API.
+import argparse
+import asyncio
+import json
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application, CallbackContext
+from telegram.request import HTTPXRequest
+
+from ban import UserBanManager, ban_command, broadcast_command, delete_command, unban_command
+from fanout import (
+    BROADCAST_CONCURRENCY, FanoutEngine, MODERATION_CONCURRENCY,
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_PER_CHAT_INTERVAL
+)
+from loadtest.fake_bot_api import CHANNEL_ID_BASE, FakeTelegram, add_simulation_arguments, start_server
+from mongodb_database import ChannelTarget
+
+logger = logging.getLogger(__name__)
+
+ADMIN_CHAT_ID = 42
+SCENARIOS = ('broadcast', 'ban', 'unban', 'delete')
+
+class TimedRequest(HTTPXRequest):
+    """HTTPXRequest that records latency of every call made to a channel"""
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.timings: List[Tuple[str, float, int]] = []
+
+    async def do_request(self, url: str, method: str, request_data: Any = None, *args: Any, **kwargs: Any) -> Tuple[int, bytes]:
+        started = time.perf_counter()
+        status, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+        chat_id = request_data.parameters.get('chat_id') if request_data else None
+        try:
+            is_channel = int(chat_id) <= CHANNEL_ID_BASE
+        except (TypeError, ValueError):
+            is_channel = False
+        if is_channel:
+            self.timings.append((url.rsplit('/', 1)[-1], time.perf_counter() - started, status))
+        return status, payload
+
+class InMemoryStore:
+    """The subset of AsyncMongoDBDatabase the fan-outs use, kept in memory"""
+    def __init__(self, channel_count: int) -> None:
+        self.targets = [
+            ChannelTarget(str(FakeTelegram.channel_id(i)), f"Load Channel {i}") for i in range(channel_count)
+        ]
+        self.broadcasts: Dict[str, Dict[str, Dict]] = {}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.failure_scores: Dict[str, int] = {}
+
+    async def get_channel_targets(self) -> List[ChannelTarget]:
+        return list(self.targets)
+
+    async def record_broadcast_results(self, broadcast_id: str, results: Dict[str, Dict]) -> None:
+        self.broadcasts.setdefault(broadcast_id, {}).update(results)
+
+    async def create_broadcast_job(self, broadcast_id: str, source: Dict[str, Any], admin_id: int,
+                                   message_ids: Optional[List[int]] = None) -> bool:
+        created = broadcast_id not in self.jobs
+        self.jobs.setdefault(broadcast_id, {
+            '_id': broadcast_id, 'source': source, 'message_ids': message_ids, 'status': 'running'
+        })
+        return created
+
+    async def get_broadcast_job(self, broadcast_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(broadcast_id)
+
+    async def update_broadcast_job(self, broadcast_id: str, **fields: Any) -> None:
+        self.jobs.get(broadcast_id, {}).update(fields)
+
+    async def get_broadcast_results(self, broadcast_id: str) -> Dict[str, Dict]:
+        return dict(self.broadcasts.get(broadcast_id, {}))
+
+    async def get_many_broadcast_results(self, broadcast_ids: List[str]) -> Dict[str, Dict[str, Dict]]:
+        return {broadcast_id: dict(self.broadcasts[broadcast_id])
+                for broadcast_id in broadcast_ids if broadcast_id in self.broadcasts}
+
+    async def delete_broadcast_results(self, broadcast_ids: List[str]) -> None:
+        for broadcast_id in broadcast_ids:
+            self.broadcasts.pop(broadcast_id, None)
+
+    async def record_channel_health(self, failures: Dict[str, str], successes: List[str],
+                                    threshold: int) -> List[str]:
+        # Scores are kept but nothing is pruned, so every scenario hits the same channels
+        for channel_id in successes:
+            self.failure_scores.pop(channel_id, None)
+        for channel_id in failures:
+            self.failure_scores[channel_id] = self.failure_scores.get(channel_id, 0) + 1
+        return []
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def _command_update(application: Application, update_id: int, text: str, reply: bool = False) -> Update:
+    command = text.split()[0]
+    message: Dict[str, Any] = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': ADMIN_CHAT_ID, 'type': 'private'},
+        'from': {'id': ADMIN_CHAT_ID, 'is_bot': False, 'first_name': 'Admin'},
+        'text': text,
+        'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+    }
+    if reply:
+        message['reply_to_message'] = {
+            'message_id': update_id - 1,
+            'date': int(time.time()),
+            'chat': {'id': ADMIN_CHAT_ID, 'type': 'private'},
+            'text': "📢 Load test broadcast"
+        }
+    return Update.de_json({'update_id': update_id, 'message': message}, application.bot)
+
+async def run_size(args: argparse.Namespace, channel_count: int) -> List[Dict[str, Any]]:
+    """Run every scenario once against channel_count simulated channels"""
+    request = TimedRequest(connection_pool_size=max(args.concurrency, args.moderation_concurrency) + 8)
+    application = (
+        Application.builder()
+        .token('123456:LOADTEST')
+        .base_url(f"{args.base_url}/bot")
+        .request(request)
+        .build()
+    )
+    store = InMemoryStore(channel_count)
+    application.bot_data['bot_instance'] = SimpleNamespace(
+        db=store,
+        ban_manager=UserBanManager(
+            store,
+            fanout=FanoutEngine(
+                max_concurrency=args.concurrency, global_rate=args.global_rate,
+                per_chat_interval=args.per_chat_interval
+            ),
+            moderation=FanoutEngine(
+                max_concurrency=args.moderation_concurrency, global_rate=None, per_chat_interval=None
+            )
+        )
+    )
+
+    commands = {
+        'broadcast': (broadcast_command, "/broadcast", True),
+        'ban': (ban_command, f"/ban {args.target_user}", False),
+        'unban': (unban_command, f"/unban {args.target_user}", False),
+        'delete': (delete_command, "/del", False),
+    }
+    results: List[Dict[str, Any]] = []
+
+    async with application:
+        for update_id, scenario in enumerate(args.scenarios, start=2):
+            handler, text, reply = commands[scenario]
+            if scenario == 'delete':
+                text = " ".join(["/del", *store.broadcasts.keys()])
+            update = _command_update(application, update_id * 2, text, reply)
+            context = CallbackContext.from_update(update, application)
+            context.args = text.split()[1:]
+
+            request.timings.clear()
+            started = time.perf_counter()
+            await handler(update, context)
+            await application.bot_data['bot_instance'].ban_manager.jobs.join()
+            wall_time = time.perf_counter() - started
+
+            latencies = [latency for _, latency, _ in request.timings]
+            errors = sum(1 for _, _, status in request.timings if status != 200)
+            result = {
+                'scenario': scenario,
+                'channels': channel_count,
+                'calls': len(latencies),
+                'errors': errors,
+                'wall_time_s': round(wall_time, 3),
+                'throughput_per_s': round(len(latencies) / wall_time, 1) if wall_time else 0.0,
+                'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+                'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+            }
+            results.append(result)
+            print(
+                f"{scenario:<10} {channel_count:>6} channels  {result['calls']:>6} calls  "
+                f"{result['errors']:>5} errors  {result['wall_time_s']:>8.2f}s  "
+                f"{result['throughput_per_s']:>8.1f}/s  p50 {result['p50_ms']:>7.1f}ms  p99 {result['p99_ms']:>7.1f}ms"
+            )
+    return results
+
+async def main(args: argparse.Namespace) -> None:
+    server = None
+    if not args.base_url:
+        telegram = FakeTelegram(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+            flood_probability=args.flood_probability, retry_after=args.retry_after,
+            kicked_every=args.kicked_every, missing_every=args.missing_every
+        )
+        server = start_server(telegram, args.port)
+        args.base_url = f"http://127.0.0.1:{args.port}"
+
+    results: List[Dict[str, Any]] = []
+    try:
+        for channel_count in args.sizes:
+            results.extend(await run_size(args, channel_count))
+    finally:
+        if server:
+            server.stop()
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'generated_at': time.time(), 'config': _config(args), 'results': results}, output, indent=2)
+        print(f"Results written to {args.json}")
+
+def _config(args: argparse.Namespace) -> Dict[str, Any]:
+    return {key: value for key, value in vars(args).items() if key not in ('json', 'verbose')}
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the channel fan-outs against a fake Bot API")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--base-url', default='', help="use an already running fake API instead of starting one")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--target-user', type=int, default=777000)
+    parser.add_argument('--concurrency', type=int, default=BROADCAST_CONCURRENCY)
+    parser.add_argument('--moderation-concurrency', type=int, default=MODERATION_CONCURRENCY)
+    parser.add_argument('--global-rate', type=float, default=TELEGRAM_GLOBAL_RATE)
+    parser.add_argument('--per-chat-interval', type=float, default=TELEGRAM_PER_CHAT_INTERVAL)
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    parser.add_argument('--verbose', action='store_true', help="show bot and access logs while running")
+    add_simulation_arguments(parser)
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    logging.basicConfig(
+        level=logging.INFO if arguments.verbose else logging.CRITICAL,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main(arguments))
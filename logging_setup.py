@@ -0,0 +1,132 @@
+# logging_setup.py - Non-blocking, rotated logging through a QueueHandler/QueueListener pair
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Optional
+
+# Level of the root logger
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Log file, rotated once it reaches LOG_MAX_BYTES; empty disables the file
+LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+# "text" for the classic format, "json" for one JSON object per line
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# Per-channel success lines tagged with a sample_key: the first LOG_SAMPLE_FIRST
+# of a burst are logged, then only every LOG_SAMPLE_EVERY-th one
+LOG_SAMPLE_FIRST = int(os.getenv('LOG_SAMPLE_FIRST', '10'))
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '100'))
+# A burst ends after this many quiet seconds and the counters start over
+LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', '60'))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key in ('sample_key', 'suppressed'):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        exception = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exception:
+            entry['exception'] = exception
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Thins out records tagged with extra={'sample_key': ...}.
+
+    Untagged records always pass. For each key the first `first` records of a
+    burst pass, then every `every`-th; passed records note how many similar
+    lines were dropped since the previous one.
+    """
+    def __init__(self, first: int = LOG_SAMPLE_FIRST, every: int = LOG_SAMPLE_EVERY,
+                 window: float = LOG_SAMPLE_WINDOW) -> None:
+        super().__init__()
+        self.first = first
+        self.every = max(1, every)
+        self.window = window
+        self._lock = Lock()
+        self._bursts: Dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample_key', None)
+        if key is None:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            seen, suppressed, last = self._bursts.get(key, (0, 0, 0.0))
+            if now - last > self.window:
+                seen, suppressed = 0, 0
+            seen += 1
+            keep = seen <= self.first or seen % self.every == 0
+            if keep:
+                record.suppressed = suppressed
+                if suppressed:
+                    record.msg = f"{record.msg} (+{suppressed} similar suppressed)"
+                suppressed = 0
+            else:
+                suppressed += 1
+            self._bursts[key] = (seen, suppressed, now)
+        return keep
+
+class TracebackQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that ships the traceback in exc_text.
+
+    The stock prepare() formats the whole record into its message and clears
+    exc_info, so formatters on the listener side never see the exception.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging(level: str = LOG_LEVEL, log_file: Optional[str] = LOG_FILE,
+                  json_format: bool = LOG_FORMAT == 'json') -> logging.handlers.QueueListener:
+    """Route all logging through a queue so callers never block on I/O.
+
+    The stream and rotating file handlers run on the listener's thread.
+    """
+    formatter: logging.Formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = TracebackQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    # httpx logs every Bot API request at INFO
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
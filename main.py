@@ -1,42 +1,30 @@
 # main.py - Main bot application for Render hosting
+import asyncio
 import logging
 import os
 import time
-from typing import List
-from threading import Thread
-from flask import Flask
+from typing import List, Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, filters, 
     ChatMemberHandler, ContextTypes, CallbackQueryHandler
 )
-from mongodb_database import MongoDBDatabase
+from mongodb_database import MongoDBDatabase, AsyncMongoDBDatabase, ACTIVITY_FLUSH_INTERVAL
 from register import ChannelRegistration
-from ban import ban_command, unban_command, broadcast_command, delete_command
-
-# Flask app for uptimerobot pinging
-app = Flask(__name__)
-
-@app.route('/')
-def home() -> str:
-    return "Bot is running!"
-
-@app.route('/health')
-def health() -> str:
-    return "OK"
-
-def run_flask() -> None:
-    app.run(host='0.0.0.0', port=5000)
-
-# Logging setup
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', 
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('bot.log')
-    ]
+from ban import (
+    ban_command, unban_command, broadcast_command, delete_command, resume_command,
+    jobs_command, pause_command, cancel_command, UserBanManager
 )
+from dead_channels import dead_command, reactivate_command
+from member_refresh import refresh_member_counts_job, MemberCountRefresher, MEMBER_REFRESH_INTERVAL
+from logging_setup import setup_logging
+from media_groups import MediaGroupCache, remember_media_group
+from metrics import HANDLER_ERRORS, HANDLER_LATENCY, InstrumentedRequest, timed
+from server import serve
+from update_processor import PerChatUpdateProcessor
+
+# Logging setup: handlers run on a background thread, bot.log is rotated
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Your Bot Token - Use environment variable for security
@@ -45,10 +33,27 @@ BOT_TOKEN = os.getenv('BOT_TOKEN', "")
 # Admin user IDs - Replace with your admin IDs
 ADMIN_IDS: List[int] = [123456789, 987654321]  # यहाँ अपने एडमिन IDs डालें
 
+# Channels shown per page of /list
+CHANNELS_PER_PAGE = int(os.getenv('CHANNELS_PER_PAGE', '10'))
+
+# Periods the /growth report can be sorted by
+GROWTH_PERIODS = ('1d', '7d', '30d')
+
+# Seconds between recounts of the materialized /stats counters
+STATS_RECONCILE_INTERVAL = int(os.getenv('STATS_RECONCILE_INTERVAL', '3600'))
+
+# callback_data prefixes of the inline buttons; each is timed as its own handler
+BUTTON_BRANCHES = ('how_to_use', 'list_channels', 'list_next', 'list_prev', 'growth', 'stats', 'back_to_main')
+
 class ChannelRegistrationBot:
     def __init__(self) -> None:
-        self.db = MongoDBDatabase()
+        self.db = AsyncMongoDBDatabase(MongoDBDatabase())
         self.registration = ChannelRegistration(self.db)
+        # Created up front: with concurrent updates, lazily creating these in
+        # handlers could give two updates different managers (and job lists)
+        self.media_groups = MediaGroupCache()
+        self.ban_manager = UserBanManager(self.db, media_groups=self.media_groups)
+        self.member_refresher = MemberCountRefresher(self.db)
 
 def is_admin(user_id: int) -> bool:
     """Check if user is admin"""
@@ -67,6 +72,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     keyboard = [
         [InlineKeyboardButton("📖 How to Use", callback_data="how_to_use")],
         [InlineKeyboardButton("📋 Channel List", callback_data="list_channels")],
+        [InlineKeyboardButton("📈 Growth", callback_data="growth:1d:0")],
         [InlineKeyboardButton("📊 Statistics", callback_data="stats")]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -84,7 +90,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await show_how_to_use(update, context)
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle inline keyboard button clicks"""
+    """Handle inline keyboard button clicks, timing each branch separately"""
+    branch = (update.callback_query.data or '').split(":", 1)[0]
+    handler_name = f"button:{branch if branch in BUTTON_BRANCHES else 'other'}"
+    try:
+        with HANDLER_LATENCY.time(handler=handler_name):
+            await _handle_button(update, context)
+    except Exception:
+        HANDLER_ERRORS.inc(handler=handler_name)
+        raise
+
+async def _handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
     
@@ -98,6 +114,14 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await show_how_to_use(update, context)
     elif query.data == "list_channels":
         await show_channel_list(update, context)
+    elif query.data.startswith(("list_next:", "list_prev:")):
+        direction, page, cursor = query.data.split(":", 2)
+        await show_channel_list(
+            update, context, cursor=cursor, backwards=direction == "list_prev", page=max(int(page), 0)
+        )
+    elif query.data.startswith("growth:"):
+        _, period, page = query.data.split(":", 2)
+        await show_growth_report(update, context, period=period, page=max(int(page), 0))
     elif query.data == "stats":
         await show_stats(update, context)
     elif query.data == "back_to_main":
@@ -108,6 +132,7 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     keyboard = [
         [InlineKeyboardButton("📖 How to Use", callback_data="how_to_use")],
         [InlineKeyboardButton("📋 Channel List", callback_data="list_channels")],
+        [InlineKeyboardButton("📈 Growth", callback_data="growth:1d:0")],
         [InlineKeyboardButton("📊 Statistics", callback_data="stats")]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -140,8 +165,15 @@ async def show_how_to_use(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         "/ban <user_id> - Ban user from all registered channels\n"
         "/unban <user_id> - Unban user from all registered channels\n"
         "/broadcast - Reply to a message to broadcast it\n"
-        "/del <broadcast_id> - Delete broadcasted messages\n"
+        "/jobs - Show running and recent broadcasts\n"
+        "/pause <job_id> - Pause a running broadcast\n"
+        "/resume [job_id] - Continue a paused or interrupted broadcast\n"
+        "/cancel <job_id> - Stop a running broadcast\n"
+        "/del <broadcast_id> [...] - Delete broadcasted messages\n"
+        "/dead - Show channels the bot can no longer reach\n"
+        "/reactivate <channel_id|all> - Put deactivated channels back\n"
         "/list - List all registered channels\n"
+        "/growth [1d|7d|30d] - Channel growth report\n"
         "/stats - Show bot statistics\n\n"
         "Note: Bot needs admin rights to access channel messages and member counts."
     )
@@ -154,10 +186,12 @@ async def show_how_to_use(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     else:
         await update.message.reply_text(help_text, reply_markup=reply_markup)
 
-async def show_channel_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Show channel list in button interface"""
+async def show_channel_list(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            cursor: Optional[str] = None, backwards: bool = False, page: int = 0) -> None:
+    """Show one page of the channel list in button interface"""
     bot_instance = context.bot_data['bot_instance']
-    channels = bot_instance.db.get_registered_channels()
+    channel_page = await bot_instance.db.get_channels_page(cursor, backwards, CHANNELS_PER_PAGE)
+    channels = channel_page.channels
     
     if not channels:
         message = "❌ No channels registered yet."
@@ -171,9 +205,9 @@ async def show_channel_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     import html
-    message = "📋 Registered Channels:\n\n"
+    message = f"📋 Registered Channels (Page {page + 1}):\n\n"
     
-    for i, channel in enumerate(channels, 1):
+    for i, channel in enumerate(channels, page * CHANNELS_PER_PAGE + 1):
         channel_id, name, username, reg_date, forward_count, last_activity, current_members = channel
         
         name_display = html.escape(name) if name else "Unknown"
@@ -189,10 +223,81 @@ async def show_channel_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
         message += f"   📧 Username: {username_display}\n"
         message += f"   📅 Registered: {reg_date_str}\n\n"
     
-    if len(message) > 4000:
-        message = message[:4000] + "\n\n... (list truncated)"
+    navigation = []
+    if channel_page.prev_cursor:
+        navigation.append(InlineKeyboardButton(
+            "⬅️ Prev", callback_data=f"list_prev:{page - 1}:{channel_page.prev_cursor}"
+        ))
+    if channel_page.next_cursor:
+        navigation.append(InlineKeyboardButton(
+            "Next ➡️", callback_data=f"list_next:{page + 1}:{channel_page.next_cursor}"
+        ))
     
     keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]]
+    if navigation:
+        keyboard.insert(0, navigation)
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    if update.callback_query:
+        await update.callback_query.edit_message_text(message, reply_markup=reply_markup)
+    else:
+        await update.message.reply_text(message, reply_markup=reply_markup)
+
+async def show_growth_report(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                             period: str = '1d', page: int = 0) -> None:
+    """Show one page of channel growth sorted by the chosen period"""
+    if period not in GROWTH_PERIODS:
+        period = '1d'
+    
+    bot_instance = context.bot_data['bot_instance']
+    rows, total = await bot_instance.db.get_growth_report(period, page, CHANNELS_PER_PAGE)
+    
+    if not rows:
+        message = "❌ No growth data yet."
+        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        if update.callback_query:
+            await update.callback_query.edit_message_text(message, reply_markup=reply_markup)
+        else:
+            await update.message.reply_text(message, reply_markup=reply_markup)
+        return
+    
+    def format_delta(value: Optional[int]) -> str:
+        if value is None:
+            return "—"
+        return f"+{value}" if value > 0 else str(value)
+    
+    import html
+    total_pages = (total + CHANNELS_PER_PAGE - 1) // CHANNELS_PER_PAGE
+    message = f"📈 Channel Growth (by {period}, Page {page + 1}/{total_pages}):\n\n"
+    
+    for i, row in enumerate(rows, page * CHANNELS_PER_PAGE + 1):
+        name = row.get('channel_name')
+        name_display = html.escape(name) if name else "Unknown"
+        
+        message += f"{i}. {name_display}\n"
+        message += f"   👥 Members: {row.get('members') if row.get('members') is not None else '—'}\n"
+        message += (
+            f"   📊 1d: {format_delta(row.get('1d'))} | "
+            f"7d: {format_delta(row.get('7d'))} | "
+            f"30d: {format_delta(row.get('30d'))}\n\n"
+        )
+    
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"growth:{period}:{page - 1}"))
+    if (page + 1) * CHANNELS_PER_PAGE < total:
+        navigation.append(InlineKeyboardButton("Next ➡️", callback_data=f"growth:{period}:{page + 1}"))
+    
+    sorting = [
+        InlineKeyboardButton(f"{'✅ ' if option == period else ''}{option}", callback_data=f"growth:{option}:0")
+        for option in GROWTH_PERIODS
+    ]
+    
+    keyboard = [sorting, [InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]]
+    if navigation:
+        keyboard.insert(0, navigation)
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     if update.callback_query:
@@ -205,7 +310,7 @@ async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     try:
         bot_instance = context.bot_data['bot_instance']
         
-        if not bot_instance.db.channels:
+        if not bot_instance.db.sync.channels:
             message = "❌ Database not available. Please check MongoDB connection."
             keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
@@ -216,14 +321,7 @@ async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
                 await update.message.reply_text(message, reply_markup=reply_markup)
             return
         
-        total_channels = bot_instance.db.channels.count_documents({'is_active': True})
-        
-        pipeline = [
-            {'$match': {'is_active': True}},
-            {'$group': {'_id': None, 'total_members': {'$sum': '$current_members'}}}
-        ]
-        result = list(bot_instance.db.channels.aggregate(pipeline))
-        total_members = result[0]['total_members'] if result else 0
+        total_channels, total_members = await bot_instance.db.get_stats()
         
         from datetime import datetime
         stats_message = (
@@ -263,6 +361,17 @@ async def list_channels(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     
     await show_channel_list(update, context)
 
+async def growth(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show channel growth report"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ आप इस बॉट का उपयोग नहीं कर सकते।")
+        return
+    
+    period = context.args[0] if context.args else '1d'
+    await show_growth_report(update, context, period=period)
+
 async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show bot statistics"""
     user_id = update.effective_user.id
@@ -289,6 +398,43 @@ async def handle_bot_added_to_channel(update: Update, context: ContextTypes.DEFA
     bot_instance = context.bot_data['bot_instance']
     await bot_instance.registration.handle_bot_added_to_channel(update, context)
 
+async def reconcile_stats_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Periodically correct drift in the /stats counters"""
+    try:
+        bot_instance = context.bot_data['bot_instance']
+        await bot_instance.db.reconcile_stats()
+    except Exception as e:
+        logger.error(f"Stats reconciliation error: {e}")
+
+async def flush_activity_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Write buffered channel activity to MongoDB"""
+    try:
+        bot_instance = context.bot_data['bot_instance']
+        await bot_instance.db.flush_activity()
+    except Exception as e:
+        logger.error(f"Activity flush error: {e}")
+
+async def on_stop(application: Application) -> None:
+    """Interrupt running broadcasts while the bot can still talk to Telegram"""
+    bot_instance = application.bot_data.get('bot_instance')
+    if bot_instance:
+        # They checkpoint and are marked interrupted, ready for /resume
+        await bot_instance.ban_manager.jobs.shutdown()
+
+async def on_shutdown(application: Application) -> None:
+    """Drain buffered writes and close the database on shutdown"""
+    bot_instance = application.bot_data.get('bot_instance')
+    if bot_instance:
+        await bot_instance.db.close()
+
+async def prune_member_samples_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Drop raw member samples that are past their retention"""
+    try:
+        bot_instance = context.bot_data['bot_instance']
+        await bot_instance.db.prune_member_samples()
+    except Exception as e:
+        logger.error(f"Member sample pruning error: {e}")
+
 # Admin commands with admin check
 async def admin_ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Ban command with admin check"""
@@ -320,6 +466,46 @@ async def admin_broadcast_command(update: Update, context: ContextTypes.DEFAULT_
     
     await broadcast_command(update, context)
 
+async def admin_resume_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Resume command with admin check"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ आप इस बॉट का उपयोग नहीं कर सकते।")
+        return
+    
+    await resume_command(update, context)
+
+async def admin_jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Jobs command with admin check"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ आप इस बॉट का उपयोग नहीं कर सकते।")
+        return
+    
+    await jobs_command(update, context)
+
+async def admin_pause_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Pause command with admin check"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ आप इस बॉट का उपयोग नहीं कर सकते।")
+        return
+    
+    await pause_command(update, context)
+
+async def admin_cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cancel command with admin check"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ आप इस बॉट का उपयोग नहीं कर सकते।")
+        return
+    
+    await cancel_command(update, context)
+
 async def admin_delete_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Delete command with admin check"""
     user_id = update.effective_user.id
@@ -330,8 +516,32 @@ async def admin_delete_command(update: Update, context: ContextTypes.DEFAULT_TYP
     
     await delete_command(update, context)
 
-def main() -> None:
-    """Start the bot"""
+async def admin_dead_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Dead channels command with admin check"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ आप इस बॉट का उपयोग नहीं कर सकते।")
+        return
+    
+    await dead_command(update, context)
+
+async def admin_reactivate_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Reactivate command with admin check"""
+    user_id = update.effective_user.id
+    
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ आप इस बॉट का उपयोग नहीं कर सकते।")
+        return
+    
+    await reactivate_command(update, context)
+
+def main(webhook: Optional[bool] = None) -> None:
+    """Start the bot.
+    
+    webhook=None picks webhook mode when WEBHOOK_URL is configured and
+    falls back to polling otherwise.
+    """
     max_retries = 3
     retry_delay = 5
     
@@ -339,47 +549,74 @@ def main() -> None:
         try:
             logger.info(f"🚀 Starting bot (attempt {attempt + 1}/{max_retries})...")
             
-            # Start Flask server in a separate thread for uptimerobot
-            flask_thread = Thread(target=run_flask)
-            flask_thread.daemon = True
-            flask_thread.start()
-            logger.info("✅ Flask server started on port 5000")
-            
             # Create application - FIXED: Using simpler approach
-            application = Application.builder().token(BOT_TOKEN).build()
+            application = (
+                Application.builder()
+                .token(BOT_TOKEN)
+                .request(InstrumentedRequest(connection_pool_size=256))
+                .concurrent_updates(PerChatUpdateProcessor())
+                .post_stop(on_stop)
+                .post_shutdown(on_shutdown)
+                .build()
+            )
             
             # Initialize bot instance and store in bot_data
             bot_instance = ChannelRegistrationBot()
             application.bot_data['bot_instance'] = bot_instance
             
             # Add handlers
-            application.add_handler(CommandHandler("start", start))
-            application.add_handler(CommandHandler("help", help_command))
-            application.add_handler(CommandHandler("list", list_channels))
-            application.add_handler(CommandHandler("stats", stats))
-            application.add_handler(CommandHandler("ban", admin_ban_command))
-            application.add_handler(CommandHandler("unban", admin_unban_command))
-            application.add_handler(CommandHandler("broadcast", admin_broadcast_command))
-            application.add_handler(CommandHandler("del", admin_delete_command))
+            application.add_handler(CommandHandler("start", timed("start", start)))
+            application.add_handler(CommandHandler("help", timed("help", help_command)))
+            application.add_handler(CommandHandler("list", timed("list", list_channels)))
+            application.add_handler(CommandHandler("growth", timed("growth", growth)))
+            application.add_handler(CommandHandler("stats", timed("stats", stats)))
+            application.add_handler(CommandHandler("ban", timed("ban", admin_ban_command)))
+            application.add_handler(CommandHandler("unban", timed("unban", admin_unban_command)))
+            application.add_handler(CommandHandler("broadcast", timed("broadcast", admin_broadcast_command)))
+            application.add_handler(CommandHandler("resume", timed("resume", admin_resume_command)))
+            application.add_handler(CommandHandler("jobs", timed("jobs", admin_jobs_command)))
+            application.add_handler(CommandHandler("pause", timed("pause", admin_pause_command)))
+            application.add_handler(CommandHandler("cancel", timed("cancel", admin_cancel_command)))
+            application.add_handler(CommandHandler("del", timed("del", admin_delete_command)))
+            application.add_handler(CommandHandler("dead", timed("dead", admin_dead_command)))
+            application.add_handler(CommandHandler("reactivate", timed("reactivate", admin_reactivate_command)))
             
             # Button handler
             application.add_handler(CallbackQueryHandler(button_handler))
             
             # Chat member handler
-            application.add_handler(ChatMemberHandler(handle_bot_added_to_channel, ChatMemberHandler.MY_CHAT_MEMBER))
+            application.add_handler(ChatMemberHandler(
+                timed("bot_added", handle_bot_added_to_channel), ChatMemberHandler.MY_CHAT_MEMBER
+            ))
             
             # Forward message handler
-            application.add_handler(MessageHandler(filters.FORWARDED, handle_forwarded_message))
+            application.add_handler(MessageHandler(filters.FORWARDED, timed("forward", handle_forwarded_message)))
+            
+            # Album items sent to the bot are remembered so /broadcast can copy the whole album.
+            # Its own group, so the message still reaches the handlers above.
+            application.add_handler(MessageHandler(
+                filters.ChatType.PRIVATE & (filters.PHOTO | filters.VIDEO | filters.Document.ALL | filters.AUDIO),
+                remember_media_group
+            ), group=-1)
+            
+            # Scheduled jobs
+            application.job_queue.run_repeating(
+                reconcile_stats_job, interval=STATS_RECONCILE_INTERVAL, first=STATS_RECONCILE_INTERVAL
+            )
+            application.job_queue.run_repeating(
+                refresh_member_counts_job, interval=MEMBER_REFRESH_INTERVAL, first=60
+            )
+            application.job_queue.run_repeating(
+                flush_activity_job, interval=ACTIVITY_FLUSH_INTERVAL, first=ACTIVITY_FLUSH_INTERVAL
+            )
+            application.job_queue.run_repeating(prune_member_samples_job, interval=86400, first=300)
             
             # Start bot
             logger.info("🤖 Bot is running! Press Ctrl+C to stop.")
             print("🤖 Bot is running! Press Ctrl+C to stop.")
             
-            application.run_polling(
-                allowed_updates=Update.ALL_TYPES, 
-                drop_pending_updates=True,
-                close_loop=False  # Important for Render
-            )
+            # Updates (webhook or polling) and the health endpoints share one event loop
+            asyncio.run(serve(application, webhook))
             break
             
         except Exception as e:
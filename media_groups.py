@@ -0,0 +1,53 @@
+# media_groups.py - Remembers the messages of recent albums so a reply to one item can broadcast all of them
+import logging
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Tuple
+
+from telegram import Message, Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+# Albums remembered per process; older ones are forgotten first
+MEDIA_GROUP_CACHE_SIZE = int(os.getenv('MEDIA_GROUP_CACHE_SIZE', '500'))
+
+class MediaGroupCache:
+    """Message IDs of recently received albums, keyed by chat and media_group_id.
+
+    Telegram delivers each album item as its own message and a reply only
+    points at one of them, so the items are collected as they arrive.
+    """
+    def __init__(self, max_groups: int = MEDIA_GROUP_CACHE_SIZE) -> None:
+        self.max_groups = max_groups
+        self._groups: "OrderedDict[Tuple[int, str], List[int]]" = OrderedDict()
+        self._lock = Lock()
+
+    def add(self, message: Message) -> None:
+        if not message.media_group_id:
+            return
+        key = (message.chat_id, message.media_group_id)
+        with self._lock:
+            message_ids = self._groups.setdefault(key, [])
+            if message.message_id not in message_ids:
+                message_ids.append(message.message_id)
+                message_ids.sort()
+            self._groups.move_to_end(key)
+            while len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+
+    def message_ids(self, message: Message) -> List[int]:
+        """All known message IDs of the album `message` belongs to, in order"""
+        if not message.media_group_id:
+            return [message.message_id]
+        with self._lock:
+            message_ids = set(self._groups.get((message.chat_id, message.media_group_id), []))
+        message_ids.add(message.message_id)
+        return sorted(message_ids)
+
+async def remember_media_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler (in its own group) that records album items sent to the bot"""
+    message = update.effective_message
+    if message and message.media_group_id:
+        context.bot_data['bot_instance'].media_groups.add(message)
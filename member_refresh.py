@@ -0,0 +1,75 @@
+# member_refresh.py - Scheduled refresh of member counts for all registered channels
+import logging
+import os
+from typing import Dict, List, Optional
+
+from telegram.ext import ContextTypes
+
+from dead_channels import ChannelHealth
+from fanout import FanoutEngine
+from mongodb_database import ChannelRecord
+
+logger = logging.getLogger(__name__)
+
+# Seconds between full member-count refreshes
+MEMBER_REFRESH_INTERVAL = int(os.getenv('MEMBER_REFRESH_INTERVAL', '21600'))
+# Channels fetched and written per batch
+MEMBER_REFRESH_BATCH_SIZE = int(os.getenv('MEMBER_REFRESH_BATCH_SIZE', '200'))
+# Parallel getChatMemberCount calls
+MEMBER_REFRESH_CONCURRENCY = int(os.getenv('MEMBER_REFRESH_CONCURRENCY', '20'))
+
+class MemberCountRefresher:
+    def __init__(self, database, fanout: Optional[FanoutEngine] = None,
+                 batch_size: int = MEMBER_REFRESH_BATCH_SIZE):
+        self.db = database
+        self.fanout = fanout if fanout is not None else FanoutEngine(
+            max_concurrency=MEMBER_REFRESH_CONCURRENCY, global_rate=None, per_chat_interval=None
+        )
+        self.batch_size = max(1, batch_size)
+
+    async def refresh_all(self, context: ContextTypes.DEFAULT_TYPE) -> int:
+        """Fetch member counts for every active channel and store them batch by batch"""
+        channels = await self.db.get_registered_channels()
+        refreshed = 0
+        health = ChannelHealth(self.db, 'member_refresh')
+
+        for start in range(0, len(channels), self.batch_size):
+            batch = channels[start:start + self.batch_size]
+            counts = await self._fetch_batch(context, batch, health)
+            if counts:
+                previous = {channel.channel_id: channel.current_members for channel in batch}
+                await self.db.bulk_update_member_counts(counts, previous)
+                refreshed += len(counts)
+
+        await health.flush()
+        logger.info(f"👥 Member counts refreshed for {refreshed}/{len(channels)} channels")
+        return refreshed
+
+    async def _fetch_batch(self, context: ContextTypes.DEFAULT_TYPE, batch: List[ChannelRecord],
+                           health: ChannelHealth) -> Dict[str, int]:
+        """Get member counts for one batch of channels concurrently"""
+        counts: Dict[str, int] = {}
+
+        async def fetch(channel: ChannelRecord) -> None:
+            # Public channels answer this even after kicking the bot, so only
+            # failures count here; writes in the fan-outs clear the score
+            try:
+                counts[channel.channel_id] = await self.fanout.call(
+                    channel.channel_id, context.bot.get_chat_member_count, channel.channel_id
+                )
+            except Exception as e:
+                health.failure(channel.channel_id, e)
+                logger.warning(f"Could not get member count for {channel.channel_id}: {e}")
+
+        await self.fanout.run(batch, fetch, operation='member_refresh')
+        return counts
+
+async def refresh_member_counts_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """JobQueue callback refreshing member counts of all channels"""
+    try:
+        bot_instance = context.bot_data['bot_instance']
+
+        await bot_instance.member_refresher.refresh_all(context)
+
+    except Exception as e:
+        logger.error(f"Member refresh job error: {e}")
@@ -0,0 +1,252 @@
+# metrics.py - In-process metrics rendered in the Prometheus text format
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from pymongo import monitoring
+from telegram.error import NetworkError, TimedOut
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """Base for labelled metrics; values are keyed by label values"""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return '\n'.join(header + self.samples())
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+REGISTRY = Registry()
+
+HANDLER_LATENCY: Histogram = REGISTRY.register(Histogram(
+    'bot_handler_duration_seconds', "Time spent handling an update, by handler", ('handler',)
+))
+HANDLER_ERRORS: Counter = REGISTRY.register(Counter(
+    'bot_handler_errors_total', "Handlers that raised, by handler", ('handler',)
+))
+TELEGRAM_REQUESTS: Counter = REGISTRY.register(Counter(
+    'telegram_api_requests_total', "Bot API calls by method and outcome (ok or error class)", ('method', 'outcome')
+))
+TELEGRAM_LATENCY: Histogram = REGISTRY.register(Histogram(
+    'telegram_api_request_duration_seconds', "Bot API call latency by method", ('method',)
+))
+MONGO_COMMAND_LATENCY: Histogram = REGISTRY.register(Histogram(
+    'mongodb_command_duration_seconds', "MongoDB command latency by command", ('command',)
+))
+MONGO_COMMAND_FAILURES: Counter = REGISTRY.register(Counter(
+    'mongodb_command_failures_total', "Failed MongoDB commands by command", ('command',)
+))
+FANOUT_ACTIVE: Gauge = REGISTRY.register(Gauge(
+    'fanout_active', "Fan-outs (broadcast, ban, ...) currently running", ('operation',)
+))
+FANOUT_THROUGHPUT: Gauge = REGISTRY.register(Gauge(
+    'fanout_throughput_per_second', "Channels processed per second by running fan-outs", ('operation',)
+))
+FANOUT_ITEMS: Counter = REGISTRY.register(Counter(
+    'fanout_items_total', "Channels processed by fan-outs", ('operation',)
+))
+
+def timed(name: str, handler: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Wrap a PTB callback so its latency and errors are recorded under name"""
+    @functools.wraps(handler)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        try:
+            with HANDLER_LATENCY.time(handler=name):
+                return await handler(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+    return wrapper
+
+class FanoutProgress:
+    """Keeps the throughput gauge of running fan-outs up to date.
+    
+    Runs of the same operation can overlap (two background broadcasts), so
+    each run keeps its own rate and the gauge shows their sum.
+    """
+    _rates: Dict[str, Dict[int, float]] = {}
+    _rates_lock = Lock()
+
+    def __init__(self, operation: str) -> None:
+        self.operation = operation
+        self.started = time.monotonic()
+        self.done = 0
+        FANOUT_ACTIVE.inc(operation=operation)
+
+    def item_done(self) -> None:
+        self.done += 1
+        FANOUT_ITEMS.inc(operation=self.operation)
+        elapsed = time.monotonic() - self.started
+        if elapsed > 0:
+            self._publish(self.done / elapsed)
+
+    def finish(self) -> None:
+        FANOUT_ACTIVE.dec(operation=self.operation)
+        self._publish(None)
+
+    def _publish(self, rate: Optional[float]) -> None:
+        """Store this run's rate (None once finished) and set the gauge to the total"""
+        with self._rates_lock:
+            rates = self._rates.setdefault(self.operation, {})
+            if rate is None:
+                rates.pop(id(self), None)
+            else:
+                rates[id(self)] = rate
+            FANOUT_THROUGHPUT.set(sum(rates.values()), operation=self.operation)
+
+# How the Bot API's HTTP status codes surface as telegram.error classes
+_STATUS_ERRORS = {400: 'BadRequest', 401: 'InvalidToken', 403: 'Forbidden', 404: 'InvalidToken',
+                  409: 'Conflict', 429: 'RetryAfter'}
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that counts and times every Bot API call"""
+    async def do_request(self, url: str, method: str, request_data: Any = None,
+                         *args: Any, **kwargs: Any) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        started = time.perf_counter()
+        try:
+            status, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+        except (TimedOut, NetworkError) as e:
+            TELEGRAM_LATENCY.observe(time.perf_counter() - started, method=api_method)
+            TELEGRAM_REQUESTS.inc(method=api_method, outcome=type(e).__name__)
+            raise
+
+        TELEGRAM_LATENCY.observe(time.perf_counter() - started, method=api_method)
+        outcome = 'ok' if 200 <= status <= 299 else _STATUS_ERRORS.get(status, 'NetworkError')
+        TELEGRAM_REQUESTS.inc(method=api_method, outcome=outcome)
+        return status, payload
+
+class MongoCommandListener(monitoring.CommandListener):
+    """pymongo listener feeding the MongoDB command metrics"""
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
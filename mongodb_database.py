@@ -1,76 +1,364 @@
 # mongodb_database.py - MongoDB operations
+import asyncio
 import logging
-from typing import List, Tuple, Optional, Any, Dict
-from pymongo import MongoClient
+from threading import Event, Lock, Thread
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Tuple, Optional, Any, Dict, Callable, Iterable, NamedTuple
+from bson import ObjectId
+from pymongo import MongoClient, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
 from pymongo.collection import Collection
-from datetime import datetime
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from datetime import datetime, timedelta
 import os
 
+from metrics import MongoCommandListener
+
 logger = logging.getLogger(__name__)
 
+# Database holding the bot's collections
+MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'channel_bot_db')
+# Size of the thread pool that runs blocking pymongo calls for async handlers
+MONGODB_MAX_WORKERS = int(os.getenv('MONGODB_MAX_WORKERS', '8'))
+# How long per-channel broadcast records are kept for /del
+BROADCAST_TTL_DAYS = int(os.getenv('BROADCAST_TTL_DAYS', '7'))
+# Number of per-channel broadcast results written per bulk_write
+BROADCAST_LEDGER_BATCH_SIZE = int(os.getenv('BROADCAST_LEDGER_BATCH_SIZE', '100'))
+# Seconds before the cached channel list is reloaded (0 keeps it until invalidated)
+CHANNEL_CACHE_TTL = float(os.getenv('CHANNEL_CACHE_TTL', '0'))
+# Watch the channels collection with a change stream and drop the cache on changes
+CHANNEL_CACHE_WATCH = os.getenv('CHANNEL_CACHE_WATCH', '').lower() in ('1', 'true', 'yes')
+# Longest wait in seconds between attempts to reopen a failed change stream
+CHANNEL_WATCH_MAX_BACKOFF = float(os.getenv('CHANNEL_WATCH_MAX_BACKOFF', '60'))
+# Days of raw per-sample member counts kept inside the daily buckets
+MEMBER_SAMPLE_RETENTION_DAYS = int(os.getenv('MEMBER_SAMPLE_RETENTION_DAYS', '14'))
+# Days of daily/hourly member-count rollups kept before the bucket expires
+MEMBER_ROLLUP_RETENTION_DAYS = int(os.getenv('MEMBER_ROLLUP_RETENTION_DAYS', '400'))
+# Buffered channel activity is flushed every this many seconds...
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '10'))
+# ...or as soon as this many channels have pending activity
+ACTIVITY_FLUSH_SIZE = int(os.getenv('ACTIVITY_FLUSH_SIZE', '500'))
+# _id of the document in the stats collection holding the /stats counters
+CHANNEL_STATS_ID = 'channels'
+# Per-sample member count collection used before the daily buckets
+LEGACY_MEMBER_COUNTS = 'member_counts'
+# Buckets rebuilt from legacy samples per bulk_write
+LEGACY_MIGRATION_BATCH_SIZE = 500
+# _id of the document in the stats collection fixing the legacy migration's day range
+LEGACY_MIGRATION_ID = 'legacy_member_counts_migration'
+
+class ChannelRecord(NamedTuple):
+    """One active channel as returned by get_registered_channels"""
+    channel_id: str
+    channel_name: Optional[str]
+    channel_username: Optional[str]
+    registered_date: datetime
+    forward_count: int
+    last_activity: datetime
+    current_members: int
+
+class ChannelTarget(NamedTuple):
+    """The two fields a fan-out needs from a channel"""
+    channel_id: str
+    channel_name: Optional[str]
+
+class ChannelPage(NamedTuple):
+    """One keyset page of the channel list with cursors to its neighbours"""
+    channels: List[ChannelRecord]
+    prev_cursor: Optional[str]
+    next_cursor: Optional[str]
+
+# Only the stored fields that make up a ChannelRecord
+CHANNEL_RECORD_PROJECTION = {'_id': 0, **{field: 1 for field in ChannelRecord._fields}}
+
+_EPOCH = datetime(1970, 1, 1)
+
+def encode_page_cursor(document: Dict[str, Any]) -> str:
+    """Encode a channel's (registered_date, _id) sort key as a short token"""
+    millis = (document['registered_date'] - _EPOCH) // timedelta(milliseconds=1)
+    return f"{millis}:{document['_id']}"
+
+def decode_page_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Decode a token produced by encode_page_cursor"""
+    millis, object_id = cursor.split(':', 1)
+    return _EPOCH + timedelta(milliseconds=int(millis)), ObjectId(object_id)
+
+def _ensure_ttl_index(collection: Collection, field: str, expire_after_seconds: int) -> None:
+    """Create a TTL index on field, or change its expiry in place when it already exists.
+    
+    create_index refuses to change the options of an existing index, so a new
+    retention setting is applied with collMod instead of blocking startup.
+    """
+    for name, index in collection.index_information().items():
+        if index['key'] != [(field, 1)]:
+            continue
+        if index.get('expireAfterSeconds') != expire_after_seconds:
+            collection.database.command(
+                'collMod', collection.name,
+                index={'name': name, 'expireAfterSeconds': expire_after_seconds}
+            )
+            logger.info(f"⏳ TTL of {collection.name}.{field} set to {expire_after_seconds}s")
+        return
+    collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+
+def _channel_record(channel: Dict[str, Any], now: datetime) -> ChannelRecord:
+    return ChannelRecord(
+        channel['channel_id'],
+        channel.get('channel_name', ''),
+        channel.get('channel_username', ''),
+        channel.get('registered_date', now),
+        channel.get('forward_count', 0),
+        channel.get('last_activity', now),
+        channel.get('current_members', 0)
+    )
+
+class ChannelCache:
+    """Process-local copy of the active channel list.
+    
+    Writes in this process update it in place; anything it cannot patch
+    (reactivation, external writes seen through the change stream) drops it
+    so the next read reloads from Mongo.
+    """
+    def __init__(self, ttl: float = CHANNEL_CACHE_TTL) -> None:
+        self.ttl = ttl
+        self._lock = Lock()
+        self._channels: Optional[List[ChannelRecord]] = None
+        self._index: Dict[str, int] = {}
+        self._loaded_at = 0.0
+        self._generation = 0
+    
+    @property
+    def generation(self) -> int:
+        return self._generation
+    
+    def get(self) -> Optional[List[ChannelRecord]]:
+        """Return the cached channels, or None when a reload is needed"""
+        with self._lock:
+            if self._channels is None:
+                return None
+            if self.ttl and time.monotonic() - self._loaded_at > self.ttl:
+                return None
+            return list(self._channels)
+    
+    def set(self, channels: List[ChannelRecord], generation: int) -> None:
+        """Store a freshly loaded list unless it was invalidated meanwhile"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._channels = list(channels)
+            self._index = {channel.channel_id: i for i, channel in enumerate(self._channels)}
+            self._loaded_at = time.monotonic()
+    
+    def invalidate(self) -> None:
+        with self._lock:
+            self._channels = None
+            self._index = {}
+            self._generation += 1
+    
+    def contains(self, channel_id: str) -> bool:
+        with self._lock:
+            return channel_id in self._index
+    
+    def add(self, channel: ChannelRecord) -> None:
+        """Put a newly registered channel at the top of the list"""
+        with self._lock:
+            self._generation += 1
+            if self._channels is None:
+                return
+            self._channels.insert(0, channel)
+            self._index = {cached.channel_id: i for i, cached in enumerate(self._channels)}
+    
+    def remove(self, channel_ids: Iterable[str]) -> None:
+        """Drop deactivated channels from the list"""
+        with self._lock:
+            self._generation += 1
+            if self._channels is None:
+                return
+            removed = set(channel_ids)
+            self._channels = [channel for channel in self._channels if channel.channel_id not in removed]
+            self._index = {channel.channel_id: i for i, channel in enumerate(self._channels)}
+    
+    def update(self, channel_id: str, **changes: Any) -> None:
+        """Patch fields of one cached channel"""
+        with self._lock:
+            self._generation += 1
+            position = self._index.get(channel_id)
+            if position is None:
+                return
+            channel = self._channels[position]
+            self._channels[position] = channel._replace(**{
+                field: value(getattr(channel, field)) if callable(value) else value
+                for field, value in changes.items()
+            })
+
+class ActivityBuffer:
+    """Write-behind buffer for per-channel forward counts and last activity.
+    
+    Events for the same channel are merged in memory (increments summed,
+    latest timestamp kept) until the next flush writes them all at once.
+    """
+    def __init__(self, max_pending: int = ACTIVITY_FLUSH_SIZE) -> None:
+        self.max_pending = max_pending
+        self._lock = Lock()
+        self._forwards: Dict[str, int] = {}
+        self._activity: Dict[str, datetime] = {}
+    
+    def add(self, channel_id: str, forwards: int = 0, activity: Optional[datetime] = None) -> bool:
+        """Merge one event; returns True once the buffer should be flushed"""
+        with self._lock:
+            if forwards:
+                self._forwards[channel_id] = self._forwards.get(channel_id, 0) + forwards
+            if activity is not None and (channel_id not in self._activity or activity > self._activity[channel_id]):
+                self._activity[channel_id] = activity
+            return len(self._activity.keys() | self._forwards.keys()) >= self.max_pending
+    
+    def drain(self) -> Tuple[Dict[str, int], Dict[str, datetime]]:
+        """Take everything pending, leaving the buffer empty"""
+        with self._lock:
+            forwards, self._forwards = self._forwards, {}
+            activity, self._activity = self._activity, {}
+            return forwards, activity
+
+def _member_sample_update(channel_id: str, member_count: int, now: datetime) -> Tuple[Dict, Dict]:
+    """Filter and update that add one sample to a channel's daily bucket.
+    
+    The bucket keeps the raw samples plus its own rollups: open/close/min/max
+    for the day and the last count seen in each hour.
+    """
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return (
+        {'channel_id': channel_id, 'day': day},
+        {
+            '$push': {'samples': {'t': now, 'c': member_count}},
+            '$inc': {'sample_count': 1},
+            '$min': {'min': member_count},
+            '$max': {'max': member_count},
+            '$set': {'close': member_count, f'hours.{now.hour:02d}': member_count, 'updated_at': now},
+            '$setOnInsert': {'open': member_count}
+        }
+    )
+
+def _add_bucket_sample(bucket: Dict[str, Any], member_count: int, at: datetime) -> None:
+    """Apply one sample to an in-memory bucket the way _member_sample_update does in Mongo"""
+    bucket['samples'].append({'t': at, 'c': member_count})
+    bucket['sample_count'] += 1
+    bucket.setdefault('open', member_count)
+    bucket['min'] = min(bucket.get('min', member_count), member_count)
+    bucket['max'] = max(bucket.get('max', member_count), member_count)
+    bucket['close'] = member_count
+    bucket['hours'][f'{at.hour:02d}'] = member_count
+    bucket['updated_at'] = at
+
+def _bucket_replace(bucket: Dict[str, Any]) -> ReplaceOne:
+    return ReplaceOne({'channel_id': bucket['channel_id'], 'day': bucket['day']}, bucket, upsert=True)
+
+def _channel_upsert_update(channel_name: Optional[str], channel_username: Optional[str],
+                           now: datetime) -> Dict[str, Any]:
+    """Update that marks a channel active, filling in defaults if it is new"""
+    return {
+        '$set': {
+            'last_activity': now,
+            'is_active': True,
+            'failure_score': 0
+        },
+        '$setOnInsert': {
+            'channel_name': channel_name,
+            'channel_username': channel_username,
+            'registered_date': now,
+            'forward_count': 0,
+            'current_members': 0
+        }
+    }
+
 class MongoDBDatabase:
-    def __init__(self) -> None:
-        self.client: Optional[MongoClient] = None
+    def __init__(self, client: Optional[MongoClient] = None, db_name: str = MONGODB_DB_NAME) -> None:
+        self.client: Optional[MongoClient] = client
+        self.db_name = db_name
         self.db: Optional[Any] = None
         self.channels: Optional[Collection] = None
-        self.member_counts: Optional[Collection] = None
+        self.member_buckets: Optional[Collection] = None
         self.broadcasts: Optional[Collection] = None
+        self.broadcast_jobs: Optional[Collection] = None
+        self.stats: Optional[Collection] = None
+        self.channel_cache = ChannelCache()
+        self.activity = ActivityBuffer()
+        self._watch_stop = Event()
         self.init_database()
+        if CHANNEL_CACHE_WATCH:
+            self.start_channel_watch()
     
     def init_database(self) -> None:
         """Initialize MongoDB connection"""
         try:
-            mongodb_url = os.getenv('MONGODB_URL', '')
-            if not mongodb_url:
-                raise ValueError("MONGODB_URL environment variable is not set")
+            if self.client is None:
+                mongodb_url = os.getenv('MONGODB_URL', '')
+                if not mongodb_url:
+                    raise ValueError("MONGODB_URL environment variable is not set")
+                self.client = MongoClient(mongodb_url, event_listeners=[MongoCommandListener()])
             
-            self.client = MongoClient(mongodb_url)
-            self.db = self.client['channel_bot_db']
+            self.db = self.client[self.db_name]
             
             # Create collections
             self.channels = self.db['channels']
-            self.member_counts = self.db['member_counts']
+            self.member_buckets = self.db['member_count_buckets']
             self.broadcasts = self.db['broadcasts']
+            self.broadcast_jobs = self.db['broadcast_jobs']
+            self.stats = self.db['stats']
             
             # Create indexes
             self.channels.create_index('channel_id', unique=True)
-            self.member_counts.create_index([('channel_id', 1), ('record_date', -1)])
+            self.channels.create_index([('is_active', 1), ('registered_date', -1), ('_id', -1)])
+            self.member_buckets.create_index([('channel_id', 1), ('day', -1)], unique=True)
+            _ensure_ttl_index(self.member_buckets, 'day', MEMBER_ROLLUP_RETENTION_DAYS * 86400)
+            self.broadcasts.create_index([('broadcast_id', 1), ('channel_id', 1)], unique=True)
+            _ensure_ttl_index(self.broadcasts, 'created_at', BROADCAST_TTL_DAYS * 86400)
+            _ensure_ttl_index(self.broadcast_jobs, 'created_at', BROADCAST_TTL_DAYS * 86400)
+            self.broadcast_jobs.create_index([('status', 1), ('created_at', -1)])
             
             logger.info("✅ MongoDB initialized successfully")
+            self.migrate_legacy_member_counts()
         except Exception as e:
             logger.error(f"❌ MongoDB connection error: {e}")
             raise
     
     def register_channel(self, channel_id: int, channel_name: Optional[str] = None, 
-                        channel_username: Optional[str] = None) -> Tuple[bool, str]:
-        """Register channel in database"""
+                        channel_username: Optional[str] = None, reachable: bool = False) -> Tuple[bool, str]:
+        """Register channel in database with a single atomic upsert.
+        
+        The upsert clears the channel's failure_score. reachable=True (the bot
+        was just added to the channel) forces the upsert even for a cached
+        channel, so a failing channel also gets its score reset.
+        """
         try:
-            existing_channel = self.channels.find_one({'channel_id': str(channel_id)})
+            now = datetime.now()
+            if not reachable and self.channel_cache.contains(str(channel_id)):
+                # Already known to be active: only the activity time changes
+                self._record_activity(str(channel_id), activity=now)
+                self.channel_cache.update(str(channel_id), last_activity=now)
+                return False, "Channel already registered. Activity updated!"
+            
+            try:
+                existing_channel = self._upsert_channel(channel_id, channel_name, channel_username, now)
+            except DuplicateKeyError:
+                # A concurrent upsert inserted it first; this one now matches it
+                existing_channel = self._upsert_channel(channel_id, channel_name, channel_username, now)
             
             if existing_channel:
-                self.channels.update_one(
-                    {'channel_id': str(channel_id)},
-                    {
-                        '$set': {
-                            'last_activity': datetime.now(),
-                            'is_active': True
-                        }
-                    }
-                )
+                if not existing_channel.get('is_active'):
+                    self._apply_stats_delta(1, existing_channel.get('current_members', 0))
+                
+                if existing_channel.get('is_active') and self.channel_cache.contains(str(channel_id)):
+                    self.channel_cache.update(str(channel_id), last_activity=now)
+                else:
+                    self.channel_cache.invalidate()
                 logger.info(f"📊 Channel activity updated: {channel_id}")
                 return False, "Channel already registered. Activity updated!"
             else:
-                channel_data: Dict[str, Any] = {
-                    'channel_id': str(channel_id),
-                    'channel_name': channel_name,
-                    'channel_username': channel_username,
-                    'registered_date': datetime.now(),
-                    'is_active': True,
-                    'forward_count': 0,
-                    'last_activity': datetime.now(),
-                    'current_members': 0
-                }
-                self.channels.insert_one(channel_data)
+                self._apply_stats_delta(1, 0)
+                self.channel_cache.add(ChannelRecord(
+                    str(channel_id), channel_name, channel_username, now, 0, now, 0
+                ))
                 logger.info(f"✅ New channel registered: {channel_id} - {channel_name}")
                 return True, "✅ Channel registered successfully!"
                 
@@ -78,92 +366,246 @@ class MongoDBDatabase:
             logger.error(f"❌ Registration error: {e}")
             return False, f"❌ Registration failed: {str(e)}"
     
+    def _upsert_channel(self, channel_id: int, channel_name: Optional[str],
+                        channel_username: Optional[str], now: datetime) -> Optional[Dict[str, Any]]:
+        """Insert or reactivate a channel, returning its state before the write"""
+        return self.channels.find_one_and_update(
+            {'channel_id': str(channel_id)},
+            _channel_upsert_update(channel_name, channel_username, now),
+            projection={'_id': 0, 'is_active': 1, 'current_members': 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    
+    def register_channels_bulk(self, channels: List[Tuple[int, Optional[str], Optional[str]]]) -> Tuple[int, int]:
+        """Register many (channel_id, channel_name, channel_username) entries at once.
+        
+        Used for imports and re-syncs. Returns (new channels, existing channels).
+        """
+        try:
+            if not channels:
+                return 0, 0
+            
+            now = datetime.now()
+            channel_ids = [str(channel_id) for channel_id, _, _ in channels]
+            reactivated = list(self.channels.find(
+                {'channel_id': {'$in': channel_ids}, 'is_active': {'$ne': True}},
+                {'_id': 0, 'current_members': 1}
+            ))
+            
+            result = self.channels.bulk_write([
+                UpdateOne(
+                    {'channel_id': str(channel_id)},
+                    _channel_upsert_update(channel_name, channel_username, now),
+                    upsert=True
+                )
+                for channel_id, channel_name, channel_username in channels
+            ], ordered=False)
+            
+            self._apply_stats_delta(
+                result.upserted_count + len(reactivated),
+                sum(channel.get('current_members', 0) for channel in reactivated)
+            )
+            self.channel_cache.invalidate()
+            
+            logger.info(f"✅ Bulk registration: {result.upserted_count} new, {result.matched_count} existing")
+            return result.upserted_count, result.matched_count
+        except Exception as e:
+            logger.error(f"❌ Bulk registration error: {e}")
+            return 0, 0
+    
     def increment_forward_count(self, channel_id: int) -> None:
-        """Increment forward message count"""
+        """Increment forward message count (buffered, written on the next flush)"""
         try:
-            self.channels.update_one(
-                {'channel_id': str(channel_id)},
-                {
-                    '$inc': {'forward_count': 1},
-                    '$set': {'last_activity': datetime.now()}
-                }
+            now = datetime.now()
+            self._record_activity(str(channel_id), forwards=1, activity=now)
+            self.channel_cache.update(
+                str(channel_id), forward_count=lambda count: count + 1, last_activity=now
             )
         except Exception as e:
             logger.error(f"❌ Forward count error: {e}")
     
-    def get_registered_channels(self) -> List[Tuple]:
+    def _record_activity(self, channel_id: str, forwards: int = 0, activity: Optional[datetime] = None) -> None:
+        if self.activity.add(channel_id, forwards, activity):
+            self.flush_activity()
+    
+    def flush_activity(self) -> int:
+        """Write buffered forward counts and activity times in one bulk_write"""
+        forwards, activity = self.activity.drain()
+        channel_ids = forwards.keys() | activity.keys()
+        if not channel_ids:
+            return 0
+        
+        operations = []
+        for channel_id in channel_ids:
+            update: Dict[str, Any] = {}
+            if channel_id in forwards:
+                update['$inc'] = {'forward_count': forwards[channel_id]}
+            if channel_id in activity:
+                update['$max'] = {'last_activity': activity[channel_id]}
+            operations.append(UpdateOne({'channel_id': channel_id}, update))
+        
+        try:
+            self.channels.bulk_write(operations, ordered=False)
+            return len(operations)
+        except Exception as e:
+            logger.error(f"❌ Activity flush error: {e}")
+            # Put the events back so the next flush retries them
+            for channel_id in channel_ids:
+                self.activity.add(channel_id, forwards.get(channel_id, 0), activity.get(channel_id))
+            return 0
+    
+    def get_registered_channels(self) -> List[ChannelRecord]:
         """Get all registered channels"""
+        cached = self.channel_cache.get()
+        if cached is not None:
+            return cached
+        
         try:
-            channels = list(self.channels.find(
-                {'is_active': True}
-            ).sort('registered_date', -1))
-            
-            result: List[Tuple] = []
-            for channel in channels:
-                result.append((
-                    channel['channel_id'],
-                    channel.get('channel_name', ''),
-                    channel.get('channel_username', ''),
-                    channel.get('registered_date', datetime.now()),
-                    channel.get('forward_count', 0),
-                    channel.get('last_activity', datetime.now()),
-                    channel.get('current_members', 0)
-                ))
+            generation = self.channel_cache.generation
+            channels = self.channels.find(
+                {'is_active': True}, CHANNEL_RECORD_PROJECTION
+            ).sort('registered_date', -1)
+            
+            now = datetime.now()
+            result: List[ChannelRecord] = [_channel_record(channel, now) for channel in channels]
+            self.channel_cache.set(result, generation)
             return result
         except Exception as e:
             logger.error(f"❌ Get channels error: {e}")
             return []
     
+    def get_channels_page(self, cursor: Optional[str] = None, backwards: bool = False,
+                          page_size: int = 10) -> ChannelPage:
+        """Get one page of active channels, newest first, starting after cursor.
+        
+        With backwards=True the page ends just before cursor instead. Each
+        call is one range query on the (is_active, registered_date, _id) index.
+        """
+        try:
+            query: Dict[str, Any] = {'is_active': True}
+            if cursor:
+                registered_date, object_id = decode_page_cursor(cursor)
+                op = '$gt' if backwards else '$lt'
+                query['$or'] = [
+                    {'registered_date': {op: registered_date}},
+                    {'registered_date': registered_date, '_id': {op: object_id}}
+                ]
+            
+            order = 1 if backwards else -1
+            documents = list(self.channels.find(
+                query, {**CHANNEL_RECORD_PROJECTION, '_id': 1}
+            ).sort([('registered_date', order), ('_id', order)]).limit(page_size + 1))
+            
+            has_more = len(documents) > page_size
+            documents = documents[:page_size]
+            if backwards:
+                documents.reverse()
+            if not documents:
+                return ChannelPage([], None, None)
+            
+            has_prev = has_more if backwards else cursor is not None
+            has_next = cursor is not None if backwards else has_more
+            now = datetime.now()
+            return ChannelPage(
+                [_channel_record(document, now) for document in documents],
+                encode_page_cursor(documents[0]) if has_prev else None,
+                encode_page_cursor(documents[-1]) if has_next else None
+            )
+        except Exception as e:
+            logger.error(f"❌ Get channels page error: {e}")
+            return ChannelPage([], None, None)
+    
+    def get_channel_targets(self) -> List[ChannelTarget]:
+        """Get ID and name of every active channel for fan-outs"""
+        cached = self.channel_cache.get()
+        if cached is not None:
+            return [ChannelTarget(channel.channel_id, channel.channel_name) for channel in cached]
+        
+        try:
+            channels = self.channels.find(
+                {'is_active': True}, {'_id': 0, 'channel_id': 1, 'channel_name': 1}
+            ).sort('registered_date', -1)
+            return [ChannelTarget(channel['channel_id'], channel.get('channel_name', '')) for channel in channels]
+        except Exception as e:
+            logger.error(f"❌ Get channel targets error: {e}")
+            return []
+    
     def update_channel_member_count(self, channel_id: int, member_count: int) -> None:
         """Update channel member count and record in history"""
         try:
-            self.channels.update_one(
+            previous = self.channels.find_one_and_update(
                 {'channel_id': str(channel_id)},
-                {
-                    '$set': {
-                        'current_members': member_count,
-                        'last_activity': datetime.now()
-                    }
-                }
+                {'$set': {'current_members': member_count}},
+                projection={'_id': 0, 'current_members': 1, 'is_active': 1},
+                return_document=ReturnDocument.BEFORE
             )
+            if previous and previous.get('is_active'):
+                self._apply_stats_delta(0, member_count - previous.get('current_members', 0))
             
-            member_count_record = {
-                'channel_id': str(channel_id),
-                'member_count': member_count,
-                'record_date': datetime.now()
-            }
-            self.member_counts.insert_one(member_count_record)
+            self._record_activity(str(channel_id), activity=datetime.now())
+            self.channel_cache.update(
+                str(channel_id), current_members=member_count, last_activity=datetime.now()
+            )
+            
+            self.member_buckets.update_one(
+                *_member_sample_update(str(channel_id), member_count, datetime.now()), upsert=True
+            )
             
             logger.info(f"Member count updated for channel: {channel_id} - {member_count}")
         except Exception as e:
             logger.error(f"Member count update error: {e}")
     
+    def bulk_update_member_counts(self, counts: Dict[str, int],
+                                  previous: Optional[Dict[str, int]] = None) -> None:
+        """Store many member counts with one bulk_write per collection.
+        
+        previous maps channel_id to the count before this refresh and is used
+        to move the total_members counter without re-reading the channels.
+        """
+        try:
+            if not counts:
+                return
+            
+            now = datetime.now()
+            self.channels.bulk_write([
+                UpdateOne({'channel_id': str(channel_id)}, {'$set': {'current_members': member_count}})
+                for channel_id, member_count in counts.items()
+            ], ordered=False)
+            self.member_buckets.bulk_write([
+                UpdateOne(*_member_sample_update(str(channel_id), member_count, now), upsert=True)
+                for channel_id, member_count in counts.items()
+            ], ordered=False)
+            
+            if previous is not None:
+                self._apply_stats_delta(0, sum(
+                    member_count - previous.get(channel_id, 0) for channel_id, member_count in counts.items()
+                ))
+            for channel_id, member_count in counts.items():
+                self.channel_cache.update(str(channel_id), current_members=member_count)
+            
+            logger.info(f"Member counts updated for {len(counts)} channels")
+        except Exception as e:
+            logger.error(f"Bulk member count update error: {e}")
+    
     def get_today_growth(self, channel_id: int) -> str:
-        """Calculate today's member growth"""
+        """Calculate today's member growth from the daily rollups"""
         try:
             today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            yesterday_start = today_start.replace(day=today_start.day-1)
-            
-            today_record = self.member_counts.find_one(
-                {
-                    'channel_id': str(channel_id),
-                    'record_date': {'$gte': today_start}
-                },
-                sort=[('record_date', -1)]
-            )
+            yesterday_start = today_start - timedelta(days=1)
             
-            yesterday_record = self.member_counts.find_one(
-                {
-                    'channel_id': str(channel_id),
-                    'record_date': {'$gte': yesterday_start, '$lt': today_start}
-                },
-                sort=[('record_date', -1)]
-            )
+            rollups = {
+                bucket['day']: bucket['close']
+                for bucket in self.member_buckets.find(
+                    {'channel_id': str(channel_id), 'day': {'$in': [yesterday_start, today_start]}},
+                    {'_id': 0, 'day': 1, 'close': 1}
+                )
+            }
             
-            if today_record and yesterday_record:
-                growth = today_record['member_count'] - yesterday_record['member_count']
+            if today_start in rollups and yesterday_start in rollups:
+                growth = rollups[today_start] - rollups[yesterday_start]
                 return f"+{growth}" if growth > 0 else str(growth)
-            elif today_record:
+            elif today_start in rollups:
                 return "New tracking"
             else:
                 return "No data"
@@ -172,8 +614,652 @@ class MongoDBDatabase:
             logger.error(f"Growth calculation error: {e}")
             return "Error"
     
+    def get_growth_report(self, sort_by: str = '1d', page: int = 0,
+                          page_size: int = 10) -> Tuple[List[Dict[str, Any]], int]:
+        """Day-over-day, 7-day and 30-day growth for every active channel.
+        
+        One aggregation over the daily rollups computes all deltas, sorts by
+        the chosen period and returns the requested page with the total count.
+        Deltas run from each channel's latest bucket, so the report does not
+        go blank between midnight and the first refresh of the day.
+        """
+        try:
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            
+            def days_before_latest(days: int) -> Dict:
+                return {'$subtract': ['$latest_day', days * 24 * 60 * 60 * 1000]}
+            
+            def earliest_close_since(days: int) -> Dict:
+                in_window = {'$and': [
+                    {'$gte': ['$$b.d', days_before_latest(days)]},
+                    {'$lt': ['$$b.d', '$latest_day']}
+                ]}
+                return {'$arrayElemAt': [{'$map': {
+                    'input': {'$filter': {'input': '$closes', 'as': 'b', 'cond': in_window}},
+                    'as': 'b',
+                    'in': '$$b.c'
+                }}, 0]}
+            
+            def close_of(day: Any) -> Dict:
+                return {'$arrayElemAt': [{'$map': {
+                    'input': {'$filter': {'input': '$closes', 'as': 'b', 'cond': {'$eq': ['$$b.d', day]}}},
+                    'as': 'b',
+                    'in': '$$b.c'
+                }}, 0]}
+            
+            def delta(baseline: Any) -> Dict:
+                return {'$cond': [
+                    {'$or': [{'$eq': ['$latest', None]}, {'$eq': [baseline, None]}]},
+                    None,
+                    {'$subtract': ['$latest', baseline]}
+                ]}
+            
+            pipeline = [
+                # The latest bucket may be yesterday's, whose 30-day baseline is a day earlier
+                {'$match': {'day': {'$gte': today - timedelta(days=31)}}},
+                # closes are pushed oldest first, so the first one in a window is its baseline
+                {'$sort': {'day': 1}},
+                {'$group': {
+                    '_id': '$channel_id',
+                    'latest_day': {'$max': '$day'},
+                    'closes': {'$push': {'d': '$day', 'c': '$close'}}
+                }},
+                {'$addFields': {
+                    'latest': close_of('$latest_day'),
+                    'yesterday': close_of(days_before_latest(1)),
+                    'week_ago': earliest_close_since(7),
+                    'month_ago': earliest_close_since(30)
+                }},
+                {'$lookup': {
+                    'from': self.channels.name,
+                    'localField': '_id',
+                    'foreignField': 'channel_id',
+                    'as': 'channel'
+                }},
+                {'$unwind': '$channel'},
+                {'$match': {'channel.is_active': True}},
+                {'$project': {
+                    '_id': 0,
+                    'channel_id': '$_id',
+                    'channel_name': '$channel.channel_name',
+                    'members': {'$ifNull': ['$latest', '$channel.current_members']},
+                    '1d': delta('$yesterday'),
+                    '7d': delta('$week_ago'),
+                    '30d': delta('$month_ago')
+                }},
+                {'$sort': {sort_by: -1, 'channel_id': 1}},
+                {'$facet': {
+                    'rows': [{'$skip': page * page_size}, {'$limit': page_size}],
+                    'total': [{'$count': 'count'}]
+                }}
+            ]
+            result = list(self.member_buckets.aggregate(pipeline))
+            if not result:
+                return [], 0
+            total = result[0]['total'][0]['count'] if result[0]['total'] else 0
+            return result[0]['rows'], total
+        except Exception as e:
+            logger.error(f"Growth report error: {e}")
+            return [], 0
+    
+    def get_member_history(self, channel_id: int, days: int = 30) -> List[Dict[str, Any]]:
+        """Get daily rollups (open/close/min/max and hourly closes) for a channel"""
+        try:
+            since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+            return list(self.member_buckets.find(
+                {'channel_id': str(channel_id), 'day': {'$gte': since}},
+                {'_id': 0, 'samples': 0}
+            ).sort('day', 1))
+        except Exception as e:
+            logger.error(f"Member history error: {e}")
+            return []
+    
+    def prune_member_samples(self, retention_days: int = MEMBER_SAMPLE_RETENTION_DAYS) -> int:
+        """Drop raw samples from buckets older than the retention, keeping their rollups"""
+        try:
+            cutoff = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=retention_days)
+            result = self.member_buckets.update_many(
+                {'day': {'$lt': cutoff}, 'samples': {'$exists': True}},
+                {'$unset': {'samples': ''}}
+            )
+            if result.modified_count:
+                logger.info(f"🧹 Pruned raw member samples from {result.modified_count} buckets")
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Member sample pruning error: {e}")
+            return 0
+    
+    def migrate_legacy_member_counts(self) -> int:
+        """One-off copy of the old member_counts samples into daily buckets, then drop it.
+        
+        Each (channel, day) bucket is rebuilt whole from its legacy samples
+        and written with a replace, so a run that fails part way is simply
+        replayed on the next start. The copied range is fixed on the first
+        attempt and ends before the first day that already had buckets, as
+        the live refresh writes those. The old collection is only dropped once
+        the buckets hold every sample of the range. Returns the samples copied.
+        """
+        try:
+            if LEGACY_MEMBER_COUNTS not in self.db.list_collection_names():
+                return 0
+            legacy = self.db[LEGACY_MEMBER_COUNTS]
+            window = self._legacy_migration_window()
+            query = {'record_date': {'$gte': window['since'], '$lt': window['until']}}
+            
+            operations: List[ReplaceOne] = []
+            bucket: Optional[Dict[str, Any]] = None
+            # Reverse of the legacy (channel_id, record_date -1) index, so no in-memory sort
+            samples = legacy.find(
+                query, {'_id': 0, 'channel_id': 1, 'member_count': 1, 'record_date': 1}
+            ).sort([('channel_id', -1), ('record_date', 1)])
+            for sample in samples:
+                day = sample['record_date'].replace(hour=0, minute=0, second=0, microsecond=0)
+                if bucket is None or (bucket['channel_id'], bucket['day']) != (sample['channel_id'], day):
+                    if bucket is not None:
+                        operations.append(_bucket_replace(bucket))
+                        if len(operations) >= LEGACY_MIGRATION_BATCH_SIZE:
+                            self.member_buckets.bulk_write(operations, ordered=False)
+                            operations = []
+                    bucket = {'channel_id': sample['channel_id'], 'day': day, 'samples': [], 'sample_count': 0,
+                              'hours': {}}
+                _add_bucket_sample(bucket, sample['member_count'], sample['record_date'])
+            if bucket is not None:
+                operations.append(_bucket_replace(bucket))
+            if operations:
+                self.member_buckets.bulk_write(operations, ordered=False)
+            
+            expected = legacy.count_documents(query)
+            copied = list(self.member_buckets.aggregate([
+                {'$match': {'day': {'$gte': window['since'], '$lt': window['until']}}},
+                {'$group': {'_id': None, 'samples': {'$sum': '$sample_count'}}}
+            ]))
+            copied_samples = copied[0]['samples'] if copied else 0
+            if copied_samples != expected:
+                logger.error(
+                    f"❌ Legacy member count migration incomplete ({copied_samples}/{expected} samples); "
+                    f"keeping {LEGACY_MEMBER_COUNTS} for the next start"
+                )
+                return 0
+            
+            legacy.drop()
+            self.stats.delete_one({'_id': LEGACY_MIGRATION_ID})
+            logger.info(f"📦 Migrated {expected} legacy member count samples into daily buckets")
+            return expected
+        except Exception as e:
+            logger.error(f"❌ Legacy member count migration error: {e}")
+            return 0
+    
+    def _legacy_migration_window(self) -> Dict[str, datetime]:
+        """The day range the legacy migration copies, chosen on its first attempt"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        first_bucket = self.member_buckets.find_one({}, {'_id': 0, 'day': 1}, sort=[('day', 1)])
+        return self.stats.find_one_and_update(
+            {'_id': LEGACY_MIGRATION_ID},
+            {'$setOnInsert': {
+                'since': today - timedelta(days=MEMBER_ROLLUP_RETENTION_DAYS),
+                'until': first_bucket['day'] if first_bucket else today
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def deactivate_channel(self, channel_id: int, reason: Optional[str] = None) -> bool:
+        """Mark a channel inactive so it is skipped by fan-outs"""
+        try:
+            previous = self.channels.find_one_and_update(
+                {'channel_id': str(channel_id), 'is_active': True},
+                {'$set': {'is_active': False, 'deactivated_at': datetime.now(), 'deactivated_reason': reason}},
+                projection={'_id': 0, 'current_members': 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if not previous:
+                return False
+            
+            self._apply_stats_delta(-1, -previous.get('current_members', 0))
+            self.channel_cache.invalidate()
+            logger.info(f"🚫 Channel deactivated: {channel_id} ({reason})")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Deactivation error: {e}")
+            return False
+    
+    def record_channel_health(self, failures: Dict[str, str], successes: List[str],
+                              threshold: int) -> List[str]:
+        """Update failure scores after a fan-out and deactivate dead channels.
+        
+        failures maps channel IDs to the terminal error they returned. Each
+        one adds 1 to the channel's failure_score and a success resets it, so
+        only channels unreachable in `threshold` fan-outs in a row are pruned.
+        The scores go in one bulk_write. Returns the IDs of the pruned channels.
+        """
+        try:
+            now = datetime.now()
+            operations: List[Any] = [
+                UpdateOne(
+                    {'channel_id': channel_id, 'is_active': True},
+                    {
+                        '$inc': {'failure_score': 1},
+                        '$set': {'last_failure_at': now, 'last_failure_reason': reason}
+                    }
+                )
+                for channel_id, reason in failures.items()
+            ]
+            healthy = [channel_id for channel_id in successes if channel_id not in failures]
+            if healthy:
+                operations.append(UpdateMany(
+                    {'channel_id': {'$in': healthy}, 'failure_score': {'$gt': 0}},
+                    {'$set': {'failure_score': 0}}
+                ))
+            if operations:
+                self.channels.bulk_write(operations, ordered=False)
+            if not failures:
+                return []
+            
+            dead = list(self.channels.find(
+                {'channel_id': {'$in': list(failures)}, 'is_active': True, 'failure_score': {'$gte': threshold}},
+                {'_id': 0, 'channel_id': 1}
+            ))
+            if not dead:
+                return []
+            
+            # One update per channel, as the stats counters may only count the ones flipped here
+            pruned: List[str] = []
+            pruned_members = 0
+            for channel in dead:
+                previous = self.channels.find_one_and_update(
+                    {'channel_id': channel['channel_id'], 'is_active': True},
+                    {'$set': {
+                        'is_active': False,
+                        'deactivated_at': now,
+                        'deactivated_reason': failures[channel['channel_id']]
+                    }},
+                    projection={'_id': 0, 'current_members': 1},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if previous:
+                    pruned.append(channel['channel_id'])
+                    pruned_members += previous.get('current_members', 0)
+            if not pruned:
+                return []
+            
+            self._apply_stats_delta(-len(pruned), -pruned_members)
+            self.channel_cache.remove(pruned)
+            logger.info(f"🚫 {len(pruned)} dead channels deactivated")
+            return pruned
+        except Exception as e:
+            logger.error(f"❌ Channel health error: {e}")
+            return []
+    
+    def get_dead_channels(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently deactivated channels"""
+        try:
+            return list(self.channels.find(
+                {'is_active': False},
+                {'_id': 0, 'channel_id': 1, 'channel_name': 1, 'deactivated_at': 1, 'deactivated_reason': 1}
+            ).sort('deactivated_at', -1).limit(limit))
+        except Exception as e:
+            logger.error(f"❌ Get dead channels error: {e}")
+            return []
+    
+    def get_failing_channels(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Active channels with recent terminal failures, worst first"""
+        try:
+            return list(self.channels.find(
+                {'is_active': True, 'failure_score': {'$gt': 0}},
+                {'_id': 0, 'channel_id': 1, 'channel_name': 1, 'failure_score': 1, 'last_failure_reason': 1}
+            ).sort('failure_score', -1).limit(limit))
+        except Exception as e:
+            logger.error(f"❌ Get failing channels error: {e}")
+            return []
+    
+    def reactivate_channels(self, channel_ids: Optional[List[str]] = None) -> int:
+        """Put deactivated channels back into fan-outs with a clean failure score.
+        
+        channel_ids=None reactivates every channel that was pruned as dead.
+        """
+        try:
+            query: Dict[str, Any] = {'is_active': False}
+            if channel_ids is None:
+                query['failure_score'] = {'$gt': 0}
+            else:
+                query['channel_id'] = {'$in': [str(channel_id) for channel_id in channel_ids]}
+            
+            channels = list(self.channels.find(query, {'_id': 0, 'current_members': 1}))
+            if not channels:
+                return 0
+            
+            result = self.channels.update_many(query, {
+                '$set': {'is_active': True, 'failure_score': 0},
+                '$unset': {'deactivated_at': '', 'deactivated_reason': ''}
+            })
+            if result.modified_count == len(channels):
+                self._apply_stats_delta(len(channels), sum(channel.get('current_members', 0) for channel in channels))
+            else:
+                # The matching set changed between the read and the update
+                self.reconcile_stats()
+            self.channel_cache.invalidate()
+            logger.info(f"♻️ {result.modified_count} channels reactivated")
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"❌ Reactivation error: {e}")
+            return 0
+    
+    def _apply_stats_delta(self, channels: int, members: int) -> None:
+        """Adjust the materialized /stats counters"""
+        if not channels and not members:
+            return
+        try:
+            self.stats.update_one(
+                {'_id': CHANNEL_STATS_ID},
+                {
+                    '$inc': {'active_channels': channels, 'total_members': members},
+                    '$set': {'updated_at': datetime.now()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"❌ Stats counter error: {e}")
+    
+    def reconcile_stats(self) -> Tuple[int, int]:
+        """Recount the /stats counters from the channels collection"""
+        total_channels = self.channels.count_documents({'is_active': True})
+        
+        pipeline = [
+            {'$match': {'is_active': True}},
+            {'$group': {'_id': None, 'total_members': {'$sum': '$current_members'}}}
+        ]
+        result = list(self.channels.aggregate(pipeline))
+        total_members = result[0]['total_members'] if result else 0
+        
+        self.stats.update_one(
+            {'_id': CHANNEL_STATS_ID},
+            {
+                '$set': {
+                    'active_channels': total_channels,
+                    'total_members': total_members,
+                    'updated_at': datetime.now(),
+                    'reconciled_at': datetime.now()
+                }
+            },
+            upsert=True
+        )
+        logger.info(f"📊 Stats reconciled: {total_channels} channels, {total_members} members")
+        return total_channels, total_members
+    
+    def get_stats(self) -> Tuple[int, int]:
+        """Get active channel count and total members"""
+        stats = self.stats.find_one({'_id': CHANNEL_STATS_ID})
+        if not stats or 'reconciled_at' not in stats:
+            return self.reconcile_stats()
+        return stats.get('active_channels', 0), stats.get('total_members', 0)
+    
+    def record_broadcast_results(self, broadcast_id: str, results: Dict[str, Dict]) -> None:
+        """Persist per-channel broadcast results in the ledger"""
+        try:
+            if not results:
+                return
+            
+            now = datetime.now()
+            operations = [
+                UpdateOne(
+                    {'broadcast_id': broadcast_id, 'channel_id': str(channel_id)},
+                    {
+                        '$set': {**result, 'updated_at': now},
+                        '$setOnInsert': {'created_at': now}
+                    },
+                    upsert=True
+                )
+                for channel_id, result in results.items()
+            ]
+            self.broadcasts.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"❌ Broadcast ledger write error: {e}")
+    
+    def get_broadcast_results(self, broadcast_id: str) -> Dict[str, Dict]:
+        """Get per-channel broadcast results from the ledger"""
+        return self.get_many_broadcast_results([broadcast_id]).get(broadcast_id, {})
+    
+    def get_many_broadcast_results(self, broadcast_ids: List[str]) -> Dict[str, Dict[str, Dict]]:
+        """Get per-channel results for several broadcasts in one query"""
+        try:
+            records = self.broadcasts.find(
+                {'broadcast_id': {'$in': list(broadcast_ids)}},
+                {'_id': 0, 'created_at': 0, 'updated_at': 0}
+            )
+            result: Dict[str, Dict[str, Dict]] = {}
+            for record in records:
+                broadcast_id = record.pop('broadcast_id')
+                channel_id = record.pop('channel_id')
+                result.setdefault(broadcast_id, {})[channel_id] = record
+            return result
+        except Exception as e:
+            logger.error(f"❌ Broadcast ledger read error: {e}")
+            return {}
+    
+    def delete_broadcast_results(self, broadcast_ids: List[str]) -> None:
+        """Remove broadcasts from the ledger"""
+        try:
+            self.broadcasts.delete_many({'broadcast_id': {'$in': list(broadcast_ids)}})
+            self.broadcast_jobs.delete_many({'_id': {'$in': list(broadcast_ids)}})
+        except Exception as e:
+            logger.error(f"❌ Broadcast ledger delete error: {e}")
+    
+    def create_broadcast_job(self, broadcast_id: str, source: Dict[str, Any], admin_id: int,
+                             message_ids: Optional[List[int]] = None) -> bool:
+        """Record the header of a broadcast, returning False if it already exists.
+        
+        The header keeps the source message, and the IDs of every album item
+        to copy, so an interrupted broadcast can be resumed after a restart.
+        """
+        now = datetime.now()
+        result = self.broadcast_jobs.update_one(
+            {'_id': broadcast_id},
+            {'$setOnInsert': {
+                'source': source,
+                'message_ids': message_ids or [source['message_id']],
+                'admin_id': admin_id,
+                'status': 'running',
+                'created_at': now,
+                'updated_at': now
+            }},
+            upsert=True
+        )
+        return result.upserted_id is not None
+    
+    def get_broadcast_job(self, broadcast_id: str) -> Optional[Dict[str, Any]]:
+        """Get a broadcast header by ID"""
+        return self.broadcast_jobs.find_one({'_id': broadcast_id})
+    
+    def update_broadcast_job(self, broadcast_id: str, **fields: Any) -> None:
+        """Set fields (status, totals, ...) on a broadcast header"""
+        try:
+            self.broadcast_jobs.update_one(
+                {'_id': broadcast_id}, {'$set': {**fields, 'updated_at': datetime.now()}}
+            )
+        except Exception as e:
+            logger.error(f"❌ Broadcast job update error: {e}")
+    
+    def get_unfinished_broadcast_jobs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Newest broadcasts that did not run to completion"""
+        return list(
+            self.broadcast_jobs.find({'status': {'$ne': 'completed'}}, {'source': 0})
+            .sort('created_at', -1)
+            .limit(limit)
+        )
+    
+    def start_channel_watch(self) -> None:
+        """Drop the channel cache when channels are added, removed or (de)activated"""
+        pipeline = [{'$match': {'$or': [
+            {'operationType': {'$in': ['insert', 'delete', 'replace', 'drop']}},
+            {'updateDescription.updatedFields.is_active': {'$exists': True}}
+        ]}}]
+        
+        def watch() -> None:
+            resume_token = None
+            backoff = 1.0
+            while not self._watch_stop.is_set():
+                try:
+                    with self.channels.watch(pipeline, resume_after=resume_token) as stream:
+                        # Changes may have been missed while the stream was down
+                        self.channel_cache.invalidate()
+                        backoff = 1.0
+                        for _ in stream:
+                            resume_token = stream.resume_token
+                            self.channel_cache.invalidate()
+                except Exception as e:
+                    if self._watch_stop.is_set():
+                        return
+                    if isinstance(e, OperationFailure):
+                        # The server refused to resume (e.g. the token fell off the oplog); start from now
+                        resume_token = None
+                    self.channel_cache.invalidate()
+                    logger.warning(f"⚠️ Channel change stream stopped, reopening in {backoff:.0f}s: {e}")
+                    self._watch_stop.wait(backoff)
+                    backoff = min(backoff * 2, CHANNEL_WATCH_MAX_BACKOFF)
+        
+        Thread(target=watch, name='channel-watch', daemon=True).start()
+        logger.info("👀 Watching channels collection for cache invalidation")
+    
     def close(self) -> None:
         """Close MongoDB connection"""
+        self._watch_stop.set()
         if self.client:
+            self.flush_activity()
             self.client.close()
             logger.info("MongoDB connection closed.")
+
+class AsyncMongoDBDatabase:
+    """Awaitable facade over MongoDBDatabase for use inside PTB handlers.
+    
+    pymongo blocks, so every call is handed to a bounded thread pool and
+    awaited instead of stalling the event loop while Mongo answers.
+    """
+    def __init__(self, database: Optional[MongoDBDatabase] = None,
+                 max_workers: int = MONGODB_MAX_WORKERS) -> None:
+        self.sync: MongoDBDatabase = database if database is not None else MongoDBDatabase()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mongodb')
+    
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking database call on the executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
+    async def register_channel(self, channel_id: int, channel_name: Optional[str] = None,
+                               channel_username: Optional[str] = None, reachable: bool = False) -> Tuple[bool, str]:
+        return await self._run(self.sync.register_channel, channel_id, channel_name, channel_username, reachable)
+    
+    async def register_channels_bulk(self, channels: List[Tuple[int, Optional[str], Optional[str]]]) -> Tuple[int, int]:
+        return await self._run(self.sync.register_channels_bulk, channels)
+    
+    async def increment_forward_count(self, channel_id: int) -> None:
+        await self._run(self.sync.increment_forward_count, channel_id)
+    
+    async def flush_activity(self) -> int:
+        return await self._run(self.sync.flush_activity)
+    
+    async def get_registered_channels(self) -> List[ChannelRecord]:
+        cached = self.sync.channel_cache.get()
+        if cached is not None:
+            return cached
+        return await self._run(self.sync.get_registered_channels)
+    
+    async def get_channels_page(self, cursor: Optional[str] = None, backwards: bool = False,
+                                page_size: int = 10) -> ChannelPage:
+        return await self._run(self.sync.get_channels_page, cursor, backwards, page_size)
+    
+    async def get_channel_targets(self) -> List[ChannelTarget]:
+        return await self._run(self.sync.get_channel_targets)
+    
+    async def update_channel_member_count(self, channel_id: int, member_count: int) -> None:
+        await self._run(self.sync.update_channel_member_count, channel_id, member_count)
+    
+    async def bulk_update_member_counts(self, counts: Dict[str, int],
+                                        previous: Optional[Dict[str, int]] = None) -> None:
+        await self._run(self.sync.bulk_update_member_counts, counts, previous)
+    
+    async def get_today_growth(self, channel_id: int) -> str:
+        return await self._run(self.sync.get_today_growth, channel_id)
+    
+    async def get_growth_report(self, sort_by: str = '1d', page: int = 0,
+                                page_size: int = 10) -> Tuple[List[Dict[str, Any]], int]:
+        return await self._run(self.sync.get_growth_report, sort_by, page, page_size)
+    
+    async def get_member_history(self, channel_id: int, days: int = 30) -> List[Dict[str, Any]]:
+        return await self._run(self.sync.get_member_history, channel_id, days)
+    
+    async def prune_member_samples(self, retention_days: int = MEMBER_SAMPLE_RETENTION_DAYS) -> int:
+        return await self._run(self.sync.prune_member_samples, retention_days)
+    
+    async def deactivate_channel(self, channel_id: int, reason: Optional[str] = None) -> bool:
+        return await self._run(self.sync.deactivate_channel, channel_id, reason)
+    
+    async def record_channel_health(self, failures: Dict[str, str], successes: List[str],
+                                    threshold: int) -> List[str]:
+        return await self._run(self.sync.record_channel_health, failures, successes, threshold)
+    
+    async def get_dead_channels(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return await self._run(self.sync.get_dead_channels, limit)
+    
+    async def get_failing_channels(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return await self._run(self.sync.get_failing_channels, limit)
+    
+    async def reactivate_channels(self, channel_ids: Optional[List[str]] = None) -> int:
+        return await self._run(self.sync.reactivate_channels, channel_ids)
+    
+    async def reconcile_stats(self) -> Tuple[int, int]:
+        return await self._run(self.sync.reconcile_stats)
+    
+    async def get_stats(self) -> Tuple[int, int]:
+        return await self._run(self.sync.get_stats)
+    
+    async def record_broadcast_results(self, broadcast_id: str, results: Dict[str, Dict]) -> None:
+        await self._run(self.sync.record_broadcast_results, broadcast_id, results)
+    
+    async def get_broadcast_results(self, broadcast_id: str) -> Dict[str, Dict]:
+        return await self._run(self.sync.get_broadcast_results, broadcast_id)
+    
+    async def get_many_broadcast_results(self, broadcast_ids: List[str]) -> Dict[str, Dict[str, Dict]]:
+        return await self._run(self.sync.get_many_broadcast_results, broadcast_ids)
+    
+    async def delete_broadcast_results(self, broadcast_ids: List[str]) -> None:
+        await self._run(self.sync.delete_broadcast_results, broadcast_ids)
+    
+    async def create_broadcast_job(self, broadcast_id: str, source: Dict[str, Any], admin_id: int,
+                                   message_ids: Optional[List[int]] = None) -> bool:
+        return await self._run(self.sync.create_broadcast_job, broadcast_id, source, admin_id, message_ids)
+    
+    async def get_broadcast_job(self, broadcast_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.sync.get_broadcast_job, broadcast_id)
+    
+    async def update_broadcast_job(self, broadcast_id: str, **fields: Any) -> None:
+        await self._run(self.sync.update_broadcast_job, broadcast_id, **fields)
+    
+    async def get_unfinished_broadcast_jobs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        return await self._run(self.sync.get_unfinished_broadcast_jobs, limit)
+    
+    async def close(self) -> None:
+        """Close MongoDB connection and stop the executor"""
+        await self._run(self.sync.close)
+        self._executor.shutdown(wait=False)
+
+class BroadcastLedgerWriter:
+    """Buffers per-channel broadcast results and writes them in batches"""
+    def __init__(self, database: AsyncMongoDBDatabase, broadcast_id: str,
+                 batch_size: int = BROADCAST_LEDGER_BATCH_SIZE) -> None:
+        self.db = database
+        self.broadcast_id = broadcast_id
+        self.batch_size = batch_size
+        self._pending: Dict[str, Dict] = {}
+    
+    async def add(self, channel_id: str, result: Dict) -> None:
+        """Queue one channel result, flushing once the batch is full"""
+        self._pending[str(channel_id)] = result
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+    
+    async def flush(self) -> None:
+        """Write all queued results"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        await self.db.record_broadcast_results(self.broadcast_id, batch)
@@ -0,0 +1,79 @@
+# progress.py - Debounced status-message updates for long-running fan-outs
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from telegram import Message
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two edits of the same status message
+PROGRESS_EDIT_INTERVAL = float(os.getenv('PROGRESS_EDIT_INTERVAL', '3'))
+
+class ProgressReporter:
+    """Keeps a status message showing the latest progress text.
+
+    update() only records the text; a background task edits the message at
+    most once every `interval` seconds and skips edits that would not change
+    it, so fan-out workers never wait on the Bot API for progress.
+    """
+    def __init__(self, message: Message, interval: float = PROGRESS_EDIT_INTERVAL) -> None:
+        self.message = message
+        self.interval = interval
+        self._shown: Optional[str] = message.text
+        self._pending: Optional[str] = None
+        self._last_edit = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, text: str) -> None:
+        """Record the latest progress text; the message catches up within `interval`"""
+        self._pending = text
+        if self._task is None or self._task.done():
+            delay = max(0.0, self._last_edit + self.interval - time.monotonic())
+            self._task = asyncio.create_task(self._run(delay))
+
+    async def finish(self, text: str) -> None:
+        """Stop periodic edits and show the final text"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._pending = text
+        await self._edit()
+
+    def cancel(self) -> None:
+        """Drop any pending edit, e.g. when the fan-out is interrupted"""
+        self._pending = None
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def _run(self, delay: float) -> None:
+        """Edit after `delay`, then keep going while updates arrive during edits"""
+        while True:
+            if delay:
+                await asyncio.sleep(delay)
+            await self._edit()
+            if self._pending is None:
+                return
+            delay = self.interval
+
+    async def _edit(self) -> None:
+        text, self._pending = self._pending, None
+        if text is None or text == self._shown:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            await self.message.edit_text(text)
+            self._shown = text
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                self._shown = text
+            else:
+                logger.warning(f"Could not update status message: {e}")
+        except Exception as e:
+            logger.warning(f"Could not update status message: {e}")
@@ -37,13 +37,14 @@ class ChannelRegistration:
                 channel_name = forward_chat.title
                 channel_username = forward_chat.username
                 
-                is_new, status_message = self.db.register_channel(
+                is_new, status_message = await self.db.register_channel(
                     channel_id, channel_name, channel_username
                 )
+                await self.db.increment_forward_count(channel_id)
                 
                 try:
                     chat_member_count = await context.bot.get_chat_member_count(channel_id)
-                    self.db.update_channel_member_count(channel_id, chat_member_count)
+                    await self.db.update_channel_member_count(channel_id, chat_member_count)
                     member_info = f"\n👥 Current Members: {chat_member_count}"
                 except Exception as e:
                     member_info = "\n⚠️ Member count unavailable (bot needs admin rights)"
@@ -88,7 +89,7 @@ class ChannelRegistration:
             )
 
     async def handle_bot_added_to_channel(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """Handle when bot is added to a channel"""
+        """Handle when bot is added to or removed from a channel"""
         try:
             if update.my_chat_member:
                 chat_member = update.my_chat_member
@@ -102,13 +103,13 @@ class ChannelRegistration:
                         channel_name = chat.title
                         channel_username = chat.username
                         
-                        is_new, status_message = self.db.register_channel(
-                            channel_id, channel_name, channel_username
+                        is_new, status_message = await self.db.register_channel(
+                            channel_id, channel_name, channel_username, reachable=True
                         )
                         
                         try:
                             chat_member_count = await context.bot.get_chat_member_count(channel_id)
-                            self.db.update_channel_member_count(channel_id, chat_member_count)
+                            await self.db.update_channel_member_count(channel_id, chat_member_count)
                             member_info = f"\n👥 Current Members: {chat_member_count}"
                         except Exception as e:
                             member_info = "\n⚠️ Member count unavailable"
@@ -139,6 +140,10 @@ class ChannelRegistration:
                             await context.bot.send_message(chat_id=user_id, text=confirmation_msg)
                         except Exception as e:
                             logger.warning(f"Could not send confirmation message: {e}")
+                    
+                    elif new_status in ['left', 'kicked']:
+                        # Take it out of fan-outs now instead of failing on it until it is pruned
+                        await self.db.deactivate_channel(chat.id, reason=f"Bot {new_status}")
                             
         except Exception as e:
             logger.error(f"Bot added error: {e}")
@@ -0,0 +1,140 @@
+# server.py - One asyncio HTTP server for Telegram webhooks and health checks
+import asyncio
+import json
+import logging
+import os
+import secrets
+import signal
+from typing import Optional
+
+import tornado.web
+from tornado.httpserver import HTTPServer
+from telegram import Update
+from telegram.ext import Application
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Render (and most hosts) tell the app which port to bind through PORT
+PORT = int(os.getenv('PORT', '5000'))
+# Public base URL for webhook mode; when empty the bot falls back to polling
+WEBHOOK_URL = os.getenv('WEBHOOK_URL') or os.getenv('RENDER_EXTERNAL_URL', '')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+# Telegram echoes this in every webhook request; a random one is used if unset
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+class HomeHandler(tornado.web.RequestHandler):
+    def get(self) -> None:
+        self.write("Bot is running!")
+
+class HealthHandler(tornado.web.RequestHandler):
+    def get(self) -> None:
+        self.write("OK")
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self) -> None:
+        """Prometheus scrape endpoint"""
+        if METRICS_TOKEN:
+            received_token = self.request.headers.get('Authorization', '')
+            if not secrets.compare_digest(received_token, f"Bearer {METRICS_TOKEN}"):
+                raise tornado.web.HTTPError(401)
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.write(REGISTRY.render())
+
+class WebhookHandler(tornado.web.RequestHandler):
+    def initialize(self, bot_application: Application, secret_token: str) -> None:
+        self.bot_application = bot_application
+        self.secret_token = secret_token
+
+    async def post(self) -> None:
+        """Hand an incoming update to the PTB update queue"""
+        received_token = self.request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not secrets.compare_digest(received_token, self.secret_token):
+            raise tornado.web.HTTPError(403)
+
+        try:
+            data = json.loads(self.request.body)
+            update = Update.de_json(data, self.bot_application.bot)
+        except Exception as e:
+            logger.warning(f"Invalid webhook payload: {e}")
+            raise tornado.web.HTTPError(400)
+
+        if update:
+            await self.bot_application.update_queue.put(update)
+        self.set_status(200)
+
+def make_web_app(application: Application, webhook: bool) -> tornado.web.Application:
+    """Routes for health checks and metrics, plus the webhook endpoint in webhook mode"""
+    routes = [
+        (r'/', HomeHandler),
+        (r'/health', HealthHandler),
+        (r'/metrics', MetricsHandler),
+    ]
+    if webhook:
+        routes.append((
+            rf'/{WEBHOOK_PATH}',
+            WebhookHandler,
+            {'bot_application': application, 'secret_token': WEBHOOK_SECRET}
+        ))
+    return tornado.web.Application(routes)
+
+async def serve(application: Application, webhook: Optional[bool] = None) -> None:
+    """Run the bot and the HTTP server on one event loop until SIGINT/SIGTERM.
+
+    Webhook mode is used when a public URL is configured; otherwise updates
+    are fetched by polling and the server only answers health checks.
+    """
+    if webhook is None:
+        webhook = bool(WEBHOOK_URL)
+    if webhook and not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL environment variable is not set")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    http_server = HTTPServer(make_web_app(application, webhook))
+    http_server.listen(PORT)
+    logger.info(f"✅ HTTP server listening on port {PORT}")
+
+    try:
+        async with application:
+            if application.post_init:
+                await application.post_init(application)
+
+            if webhook:
+                webhook_url = f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}"
+                await application.bot.set_webhook(
+                    url=webhook_url,
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True,
+                    secret_token=WEBHOOK_SECRET
+                )
+                logger.info(f"🌐 Webhook set to {webhook_url}")
+            else:
+                await application.updater.start_polling(
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True
+                )
+                logger.info("🔁 Polling for updates")
+
+            await application.start()
+            await stop_event.wait()
+
+            logger.info("🛑 Stopping bot...")
+            if application.updater.running:
+                await application.updater.stop()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    finally:
+        http_server.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
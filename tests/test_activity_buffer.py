@@ -0,0 +1,50 @@
+# tests/test_activity_buffer.py - Merging and re-queueing of buffered channel activity
+from datetime import datetime, timedelta
+
+import pytest
+
+from mongodb_database import ActivityBuffer
+
+def test_events_for_a_channel_are_merged():
+    buffer = ActivityBuffer(max_pending=10)
+    early = datetime(2024, 1, 1, 12, 0)
+    late = early + timedelta(minutes=5)
+
+    buffer.add('-1001', forwards=1, activity=late)
+    buffer.add('-1001', forwards=2, activity=early)
+    buffer.add('-1002', activity=early)
+
+    forwards, activity = buffer.drain()
+    assert forwards == {'-1001': 3}
+    assert activity == {'-1001': late, '-1002': early}
+    assert buffer.drain() == ({}, {})
+
+def test_add_reports_when_full():
+    buffer = ActivityBuffer(max_pending=2)
+    assert not buffer.add('-1001', forwards=1)
+    assert not buffer.add('-1001', activity=datetime.now())
+    assert buffer.add('-1002', forwards=1)
+
+def test_failed_flush_requeues_events():
+    mongomock = pytest.importorskip('mongomock')
+    from mongodb_database import MongoDBDatabase
+
+    database = MongoDBDatabase(client=mongomock.MongoClient(), db_name='test_activity_buffer')
+    database.channels.insert_one({'channel_id': '-1001', 'forward_count': 0, 'is_active': True})
+    now = datetime(2024, 1, 1, 12, 0)
+    database.activity.add('-1001', forwards=2, activity=now)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("connection lost")
+
+    write = database.channels.bulk_write
+    database.channels.bulk_write = fail
+    assert database.flush_activity() == 0
+    database.channels.bulk_write = write
+
+    # Events arriving after the failure merge with the re-queued ones
+    database.activity.add('-1001', forwards=1)
+    assert database.flush_activity() == 1
+    channel = database.channels.find_one({'channel_id': '-1001'})
+    assert channel['forward_count'] == 3
+    assert channel['last_activity'] == now
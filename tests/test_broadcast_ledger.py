@@ -0,0 +1,58 @@
+# tests/test_broadcast_ledger.py - Idempotent per-channel broadcast results and job headers
+import asyncio
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from mongodb_database import AsyncMongoDBDatabase, BroadcastLedgerWriter, MongoDBDatabase
+
+@pytest.fixture
+def database():
+    return MongoDBDatabase(client=mongomock.MongoClient(), db_name='test_broadcast_ledger')
+
+def test_recording_twice_keeps_one_row_per_channel(database):
+    database.record_broadcast_results('b1', {'-1': {'status': 'failed', 'reason': 'x'}, '-2': {'status': 'success'}})
+    created_at = database.broadcasts.find_one({'channel_id': '-1'})['created_at']
+    database.record_broadcast_results('b1', {'-1': {'status': 'success', 'message_id': 7}})
+
+    assert database.broadcasts.count_documents({'broadcast_id': 'b1'}) == 2
+    assert database.broadcasts.find_one({'channel_id': '-1'})['created_at'] == created_at
+    results = database.get_broadcast_results('b1')
+    assert results['-1']['status'] == 'success' and results['-1']['message_id'] == 7
+    assert results['-2'] == {'status': 'success'}
+
+def test_results_are_kept_per_broadcast(database):
+    database.record_broadcast_results('b1', {'-1': {'status': 'success'}})
+    database.record_broadcast_results('b2', {'-1': {'status': 'failed'}})
+    results = database.get_many_broadcast_results(['b1', 'b2', 'missing'])
+    assert set(results) == {'b1', 'b2'}
+    assert results['b2']['-1']['status'] == 'failed'
+
+def test_job_header_is_created_once(database):
+    source = {'message_id': 5, 'chat': {'id': 1}}
+    assert database.create_broadcast_job('b1', source, admin_id=1)
+    database.update_broadcast_job('b1', status='interrupted')
+    assert not database.create_broadcast_job('b1', source, admin_id=1)
+    job = database.get_broadcast_job('b1')
+    assert job['status'] == 'interrupted' and job['message_ids'] == [5]
+    assert [job['_id'] for job in database.get_unfinished_broadcast_jobs()] == ['b1']
+
+def test_delete_removes_results_and_header(database):
+    database.create_broadcast_job('b1', {'message_id': 5, 'chat': {'id': 1}}, admin_id=1)
+    database.record_broadcast_results('b1', {'-1': {'status': 'success'}})
+    database.delete_broadcast_results(['b1'])
+    assert database.get_broadcast_results('b1') == {}
+    assert database.get_broadcast_job('b1') is None
+
+def test_ledger_writer_flushes_in_batches(database):
+    async def scenario():
+        ledger = BroadcastLedgerWriter(AsyncMongoDBDatabase(database), 'b1', batch_size=2)
+        await ledger.add('-1', {'status': 'success'})
+        assert database.broadcasts.count_documents({}) == 0
+        await ledger.add('-2', {'status': 'success'})
+        assert database.broadcasts.count_documents({}) == 2
+        await ledger.add('-3', {'status': 'failed'})
+        await ledger.flush()
+        assert database.broadcasts.count_documents({}) == 3
+    asyncio.run(scenario())
@@ -0,0 +1,104 @@
+# tests/test_channel_health.py - Failure scores, dead-channel pruning and reactivation
+import asyncio
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from telegram.error import BadRequest, Forbidden, TimedOut
+
+from dead_channels import ChannelHealth
+from mongodb_database import AsyncMongoDBDatabase, CHANNEL_STATS_ID, MongoDBDatabase
+
+@pytest.fixture
+def database():
+    database = MongoDBDatabase(client=mongomock.MongoClient(), db_name='test_channel_health')
+    for channel_id, members in (('-1', 100), ('-2', 50), ('-3', 10)):
+        database.register_channel(int(channel_id), f'channel{channel_id}')
+        database.update_channel_member_count(int(channel_id), members)
+    database.reconcile_stats()
+    return database
+
+def counters(database: MongoDBDatabase) -> tuple:
+    stats = database.stats.find_one({'_id': CHANNEL_STATS_ID})
+    return stats['active_channels'], stats['total_members']
+
+def channel(database: MongoDBDatabase, channel_id: str) -> dict:
+    return database.channels.find_one({'channel_id': channel_id})
+
+def test_channel_is_pruned_after_threshold_failures_in_a_row(database):
+    for _ in range(2):
+        assert database.record_channel_health({'-1': 'Forbidden: kicked'}, ['-2'], threshold=3) == []
+    assert channel(database, '-1')['failure_score'] == 2
+    assert channel(database, '-1')['is_active']
+
+    assert database.record_channel_health({'-1': 'Forbidden: kicked'}, [], threshold=3) == ['-1']
+    dead = channel(database, '-1')
+    assert not dead['is_active'] and dead['deactivated_reason'] == 'Forbidden: kicked'
+    assert counters(database) == (2, 60)
+    assert [row['channel_id'] for row in database.get_dead_channels()] == ['-1']
+
+def test_success_resets_the_score(database):
+    database.record_channel_health({'-1': 'Forbidden: kicked', '-2': 'Forbidden: kicked'}, [], threshold=3)
+    database.record_channel_health({'-2': 'Forbidden: kicked'}, ['-1'], threshold=3)
+    assert channel(database, '-1')['failure_score'] == 0
+    assert [row['channel_id'] for row in database.get_failing_channels()] == ['-2']
+
+    # A channel that both failed and succeeded in one fan-out keeps its failure
+    database.record_channel_health({'-2': 'Forbidden: kicked'}, ['-2'], threshold=3)
+    assert not channel(database, '-2')['is_active']
+
+def test_reactivation_restores_the_counters(database):
+    database.record_channel_health({'-1': 'x', '-2': 'y'}, [], threshold=1)
+    assert counters(database) == (1, 10)
+
+    assert database.reactivate_channels(['-2']) == 1
+    assert counters(database) == (2, 60)
+    assert database.reactivate_channels() == 1
+    assert counters(database) == (3, 160)
+    assert database.reactivate_channels() == 0
+
+def test_concurrent_reactivation_is_not_counted_twice(database, monkeypatch):
+    database.record_channel_health({'-1': 'x', '-2': 'y'}, [], threshold=1)
+    update_many = database.channels.update_many
+
+    def racing_update_many(query, update, **kwargs):
+        # Another /reactivate gets to one of the channels first
+        update_many({'channel_id': '-1'}, update)
+        return update_many(query, update, **kwargs)
+
+    monkeypatch.setattr(database.channels, 'update_many', racing_update_many)
+    assert database.reactivate_channels() == 1
+    assert counters(database) == (3, 160)
+
+def test_concurrent_deactivation_is_not_counted_twice(database, monkeypatch):
+    find_one_and_update = database.channels.find_one_and_update
+
+    def racing_find_one_and_update(query, update, **kwargs):
+        if query['channel_id'] == '-1':
+            # The channel is deactivated by hand between the score update and the pruning
+            monkeypatch.setattr(database.channels, 'find_one_and_update', find_one_and_update)
+            database.deactivate_channel(-1, 'manual')
+        return find_one_and_update(query, update, **kwargs)
+
+    monkeypatch.setattr(database.channels, 'find_one_and_update', racing_find_one_and_update)
+    assert database.record_channel_health({'-1': 'x', '-2': 'y'}, [], threshold=1) == ['-2']
+    assert channel(database, '-1')['deactivated_reason'] == 'manual'
+    assert counters(database) == (1, 10)
+
+def test_only_terminal_errors_count():
+    health = ChannelHealth(database=None, operation='test')
+    assert health.failure('-1', Forbidden("bot was kicked from the channel chat"))
+    assert health.failure('-2', BadRequest("Chat not found"))
+    assert not health.failure('-3', BadRequest("Not enough rights to send text messages"))
+    assert not health.failure('-4', TimedOut())
+    assert set(health.failures) == {'-1', '-2'}
+
+def test_flush_prunes_through_the_async_database(database):
+    async def scenario():
+        health = ChannelHealth(AsyncMongoDBDatabase(database), 'test', threshold=1)
+        health.failure('-3', Forbidden("bot was kicked from the channel chat"))
+        health.success('-1')
+        return await health.flush()
+    assert asyncio.run(scenario()) == ['-3']
+    assert counters(database) == (2, 150)
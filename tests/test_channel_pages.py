@@ -0,0 +1,79 @@
+# tests/test_channel_pages.py - Keyset cursors and Prev/Next edges of /list paging
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from mongodb_database import MongoDBDatabase, decode_page_cursor, encode_page_cursor
+
+PAGE_SIZE = 10
+
+@pytest.fixture
+def database():
+    return MongoDBDatabase(client=mongomock.MongoClient(), db_name='test_channel_pages')
+
+def add_channels(database: MongoDBDatabase, count: int, same_date: bool = False) -> list:
+    """Insert channels newest-last and return their IDs newest-first"""
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        database.channels.insert_one({
+            'channel_id': str(-1000 - i),
+            'channel_name': f"Channel {i}",
+            'registered_date': start if same_date else start + timedelta(minutes=i),
+            'is_active': True
+        })
+    return [str(-1000 - i) for i in reversed(range(count))]
+
+def ids(page) -> list:
+    return [channel.channel_id for channel in page.channels]
+
+def test_cursor_round_trip():
+    document = {'registered_date': datetime(2024, 5, 17, 12, 30, 15, 123000), '_id': mongomock.ObjectId()}
+    assert decode_page_cursor(encode_page_cursor(document)) == (document['registered_date'], document['_id'])
+
+def test_pages_forward_and_back(database):
+    expected = add_channels(database, 25)
+
+    first = database.get_channels_page(page_size=PAGE_SIZE)
+    assert ids(first) == expected[:10]
+    assert first.prev_cursor is None and first.next_cursor
+
+    second = database.get_channels_page(first.next_cursor, page_size=PAGE_SIZE)
+    assert ids(second) == expected[10:20]
+    assert second.prev_cursor and second.next_cursor
+
+    last = database.get_channels_page(second.next_cursor, page_size=PAGE_SIZE)
+    assert ids(last) == expected[20:]
+    assert last.prev_cursor and last.next_cursor is None
+
+    back = database.get_channels_page(last.prev_cursor, backwards=True, page_size=PAGE_SIZE)
+    assert ids(back) == expected[10:20]
+    assert back.prev_cursor and back.next_cursor
+
+    start = database.get_channels_page(back.prev_cursor, backwards=True, page_size=PAGE_SIZE)
+    assert ids(start) == expected[:10]
+    assert start.prev_cursor is None and start.next_cursor
+
+def test_exactly_one_page_has_no_next(database):
+    add_channels(database, PAGE_SIZE)
+    page = database.get_channels_page(page_size=PAGE_SIZE)
+    assert len(page.channels) == PAGE_SIZE
+    assert page.prev_cursor is None and page.next_cursor is None
+
+def test_equal_dates_are_split_by_id(database):
+    expected = set(add_channels(database, 15, same_date=True))
+    first = database.get_channels_page(page_size=PAGE_SIZE)
+    second = database.get_channels_page(first.next_cursor, page_size=PAGE_SIZE)
+    assert len(first.channels) == 10 and len(second.channels) == 5
+    assert set(ids(first)) | set(ids(second)) == expected
+    assert second.next_cursor is None
+
+def test_inactive_channels_are_skipped(database):
+    expected = add_channels(database, 3)
+    database.channels.update_one({'channel_id': expected[1]}, {'$set': {'is_active': False}})
+    assert ids(database.get_channels_page(page_size=PAGE_SIZE)) == [expected[0], expected[2]]
+
+def test_empty_list(database):
+    page = database.get_channels_page(page_size=PAGE_SIZE)
+    assert page.channels == [] and page.prev_cursor is None and page.next_cursor is None
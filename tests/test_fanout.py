@@ -0,0 +1,136 @@
+# tests/test_fanout.py - Rate limiting, flood-wait retries and concurrency of FanoutEngine
+import asyncio
+import time
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+from fanout import FanoutControl, FanoutEngine, PerChatLimiter, TokenBucket
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_token_bucket_spaces_calls_after_the_burst():
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started
+    # One token up front, then five more at 50/s
+    assert run(scenario()) >= 0.09
+
+def test_per_chat_limiter_only_delays_the_same_chat():
+    async def scenario():
+        limiter = PerChatLimiter(interval=0.05)
+        started = time.monotonic()
+        for chat_id in range(10):
+            await limiter.acquire(chat_id)
+        spread = time.monotonic() - started
+        for _ in range(3):
+            await limiter.acquire('same')
+        return spread, time.monotonic() - started - spread
+    spread, same_chat = run(scenario())
+    assert spread < 0.03
+    assert same_chat >= 0.09
+
+def test_retry_after_retries_only_that_call():
+    async def scenario():
+        engine = FanoutEngine(global_rate=None, per_chat_interval=None, max_retries=2)
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RetryAfter(0)
+            return 'sent'
+        return await engine.call(1, flaky), len(attempts)
+    assert run(scenario()) == ('sent', 3)
+
+def test_retry_after_gives_up_after_max_retries():
+    async def scenario():
+        engine = FanoutEngine(global_rate=None, per_chat_interval=None, max_retries=2)
+        attempts = []
+
+        async def flooded():
+            attempts.append(1)
+            raise RetryAfter(0)
+        with pytest.raises(RetryAfter):
+            await engine.call(1, flooded)
+        return len(attempts)
+    assert run(scenario()) == 3
+
+def test_other_errors_are_not_retried():
+    async def scenario():
+        engine = FanoutEngine(global_rate=None, per_chat_interval=None)
+        attempts = []
+
+        async def kicked():
+            attempts.append(1)
+            raise BadRequest("Chat not found")
+        with pytest.raises(BadRequest):
+            await engine.call(1, kicked)
+        return len(attempts)
+    assert run(scenario()) == 1
+
+def test_run_bounds_concurrency_and_survives_worker_errors():
+    async def scenario():
+        engine = FanoutEngine(max_concurrency=3, global_rate=None, per_chat_interval=None)
+        in_flight, peak, done = 0, 0, []
+
+        async def worker(item):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if item == 4:
+                raise RuntimeError("boom")
+            done.append(item)
+        await engine.run(range(10), worker, operation='test')
+        return peak, sorted(done)
+    peak, done = run(scenario())
+    assert peak == 3
+    assert done == [0, 1, 2, 3, 5, 6, 7, 8, 9]
+
+def test_control_pauses_and_cancels_between_items():
+    async def scenario():
+        engine = FanoutEngine(max_concurrency=1, global_rate=None, per_chat_interval=None)
+        control = FanoutControl()
+        done = []
+
+        async def worker(item):
+            done.append(item)
+            if item == 1:
+                control.pause()
+        task = asyncio.create_task(engine.run(range(5), worker, control=control))
+        await asyncio.sleep(0.02)
+        assert done == [0, 1] and control.paused
+        control.cancel()
+        await task
+        return done
+    assert run(scenario()) == [0, 1]
+
+def test_call_passes_chat_id_through_to_the_bot_method():
+    async def scenario():
+        engine = FanoutEngine(global_rate=None, per_chat_interval=None)
+
+        async def ban_chat_member(chat_id, user_id):
+            return chat_id, user_id
+        return await engine.call(-1001, ban_chat_member, chat_id=-1001, user_id=42)
+    assert run(scenario()) == (-1001, 42)
+
+def test_moderation_engine_is_not_rate_limited():
+    async def scenario():
+        engine = FanoutEngine(max_concurrency=50, global_rate=None, per_chat_interval=None)
+        calls = []
+
+        async def unban(chat_id):
+            await asyncio.sleep(0.01)
+            calls.append(chat_id)
+        started = time.monotonic()
+        await engine.run(range(100), lambda chat_id: engine.call(chat_id, unban, chat_id), operation='ban')
+        return len(calls), time.monotonic() - started
+    calls, elapsed = run(scenario())
+    assert calls == 100
+    assert elapsed < 0.2
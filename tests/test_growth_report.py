@@ -0,0 +1,44 @@
+# tests/test_growth_report.py - Growth deltas from the daily member buckets
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from mongodb_database import MongoDBDatabase, _member_sample_update
+
+@pytest.fixture
+def database():
+    database = MongoDBDatabase(client=mongomock.MongoClient(), db_name='test_growth_report')
+    database.register_channel(-1, 'one')
+    database.register_channel(-2, 'two')
+    return database
+
+def add_closes(database: MongoDBDatabase, channel_id: str, closes: dict) -> None:
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for days_ago, close in closes.items():
+        at = today - timedelta(days=days_ago, hours=-12)
+        database.member_buckets.update_one(*_member_sample_update(channel_id, close, at), upsert=True)
+
+def test_deltas_before_the_first_refresh_of_the_day(database):
+    add_closes(database, '-1', {30: 10, 20: 20, 8: 30, 7: 40, 2: 50, 1: 60})
+
+    rows, total = database.get_growth_report('1d')
+    assert total == 1
+    assert rows[0] == {'channel_id': '-1', 'channel_name': 'one', 'members': 60, '1d': 10, '7d': 30, '30d': 50}
+
+def test_channels_sort_by_the_chosen_period(database):
+    add_closes(database, '-1', {7: 100, 1: 101, 0: 102})
+    add_closes(database, '-2', {7: 10, 1: 40, 0: 40})
+
+    rows, _ = database.get_growth_report('1d')
+    assert [(row['channel_id'], row['1d']) for row in rows] == [('-1', 1), ('-2', 0)]
+    rows, _ = database.get_growth_report('7d')
+    assert [(row['channel_id'], row['7d']) for row in rows] == [('-2', 30), ('-1', 2)]
+
+def test_first_bucket_has_no_baseline(database):
+    add_closes(database, '-2', {0: 5})
+
+    rows, _ = database.get_growth_report('1d')
+    assert rows[0]['members'] == 5
+    assert (rows[0]['1d'], rows[0]['7d'], rows[0]['30d']) == (None, None, None)
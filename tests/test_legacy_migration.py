@@ -0,0 +1,74 @@
+# tests/test_legacy_migration.py - Copying the old member_counts samples into daily buckets
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+import mongodb_database
+from mongodb_database import LEGACY_MEMBER_COUNTS, MongoDBDatabase, _member_sample_update
+
+@pytest.fixture
+def database():
+    return MongoDBDatabase(client=mongomock.MongoClient(), db_name='test_legacy_migration')
+
+def add_legacy_samples(database: MongoDBDatabase) -> list:
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    samples = [
+        {'channel_id': channel_id, 'member_count': 100 * n + day, 'record_date': today - timedelta(days=day, hours=-n)}
+        for channel_id in ('-1', '-2', '-3')
+        for day in (1, 2, 3)
+        for n in (1, 2)
+    ]
+    database.db[LEGACY_MEMBER_COUNTS].insert_many([dict(sample) for sample in samples])
+    return samples
+
+def bucket_samples(database: MongoDBDatabase) -> set:
+    return {
+        (bucket['channel_id'], sample['t'], sample['c'])
+        for bucket in database.member_buckets.find()
+        for sample in bucket['samples']
+    }
+
+def test_failed_batch_is_replayed_on_the_next_start(database, monkeypatch):
+    samples = add_legacy_samples(database)
+    monkeypatch.setattr(mongodb_database, 'LEGACY_MIGRATION_BATCH_SIZE', 2)
+    bulk_write = database.member_buckets.bulk_write
+    calls = []
+
+    def failing_bulk_write(operations, **kwargs):
+        calls.append(len(operations))
+        if len(calls) == 2:
+            # Half the batch lands before the failure
+            bulk_write(operations[:1], **kwargs)
+            raise RuntimeError('connection reset')
+        return bulk_write(operations, **kwargs)
+
+    monkeypatch.setattr(database.member_buckets, 'bulk_write', failing_bulk_write)
+    assert database.migrate_legacy_member_counts() == 0
+    assert LEGACY_MEMBER_COUNTS in database.db.list_collection_names()
+
+    monkeypatch.setattr(database.member_buckets, 'bulk_write', bulk_write)
+    assert database.migrate_legacy_member_counts() == len(samples)
+    assert LEGACY_MEMBER_COUNTS not in database.db.list_collection_names()
+    assert bucket_samples(database) == {
+        (sample['channel_id'], sample['record_date'], sample['member_count']) for sample in samples
+    }
+    for bucket in database.member_buckets.find():
+        assert bucket['sample_count'] == 2
+        assert bucket['open'] == min(sample['c'] for sample in bucket['samples'])
+        assert bucket['close'] == max(sample['c'] for sample in bucket['samples'])
+
+def test_days_already_bucketed_are_left_to_the_live_refresh(database):
+    samples = add_legacy_samples(database)
+    first_day = min(sample['record_date'] for sample in samples).replace(hour=0)
+    live_filter, live_update = _member_sample_update('-1', 999, first_day + timedelta(days=1, hours=12))
+    database.member_buckets.update_one(live_filter, live_update, upsert=True)
+
+    assert database.migrate_legacy_member_counts() == 6
+    assert LEGACY_MEMBER_COUNTS not in database.db.list_collection_names()
+    assert {
+        bucket['day'] for bucket in database.member_buckets.find({'sample_count': 2})
+    } == {first_day}
+    live = database.member_buckets.find_one({'day': first_day + timedelta(days=1)})
+    assert [sample['c'] for sample in live['samples']] == [999]
@@ -0,0 +1,84 @@
+# tests/test_progress.py - Debounced status-message edits
+import asyncio
+import time
+
+from telegram.error import BadRequest
+
+from progress import ProgressReporter
+
+INTERVAL = 0.05
+
+class FakeMessage:
+    def __init__(self, text: str = "🔄 Starting...", error: Exception = None) -> None:
+        self.text = text
+        self.error = error
+        self.edits = []
+
+    async def edit_text(self, text: str) -> None:
+        self.edits.append((time.monotonic(), text))
+        if self.error:
+            raise self.error
+
+def texts(message: FakeMessage) -> list:
+    return [text for _, text in message.edits]
+
+def test_updates_are_coalesced_and_spaced():
+    async def scenario():
+        message = FakeMessage()
+        progress = ProgressReporter(message, interval=INTERVAL)
+        for done in range(1, 4):
+            progress.update(f"{done}/10")
+        await asyncio.sleep(0)
+        assert texts(message) == ["3/10"]
+
+        for done in range(4, 8):
+            progress.update(f"{done}/10")
+            await asyncio.sleep(0)
+        assert texts(message) == ["3/10"]
+        await asyncio.sleep(INTERVAL * 3)
+        assert texts(message) == ["3/10", "7/10"]
+        assert message.edits[1][0] - message.edits[0][0] >= INTERVAL * 0.9
+    asyncio.run(scenario())
+
+def test_unchanged_text_is_not_edited():
+    async def scenario():
+        message = FakeMessage("1/10")
+        progress = ProgressReporter(message, interval=INTERVAL)
+        progress.update("1/10")
+        await asyncio.sleep(INTERVAL)
+        await progress.finish("1/10")
+        assert message.edits == []
+    asyncio.run(scenario())
+
+def test_not_modified_counts_as_shown():
+    async def scenario():
+        message = FakeMessage(error=BadRequest("Message is not modified"))
+        progress = ProgressReporter(message, interval=INTERVAL)
+        progress.update("1/10")
+        await asyncio.sleep(0)
+        await progress.finish("1/10")
+        assert texts(message) == ["1/10"]
+    asyncio.run(scenario())
+
+def test_cancel_drops_the_pending_edit():
+    async def scenario():
+        message = FakeMessage()
+        progress = ProgressReporter(message, interval=INTERVAL)
+        progress.update("1/10")
+        await asyncio.sleep(0)
+        progress.update("2/10")
+        progress.cancel()
+        await asyncio.sleep(INTERVAL * 3)
+        assert texts(message) == ["1/10"]
+    asyncio.run(scenario())
+
+def test_finish_shows_the_final_text_straight_away():
+    async def scenario():
+        message = FakeMessage()
+        progress = ProgressReporter(message, interval=10)
+        progress.update("1/10")
+        await asyncio.sleep(0)
+        progress.update("2/10")
+        await progress.finish("✅ Done")
+        assert texts(message) == ["1/10", "✅ Done"]
+    asyncio.run(scenario())
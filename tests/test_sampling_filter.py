@@ -0,0 +1,65 @@
+# tests/test_sampling_filter.py - Burst sampling of tagged log records and the logging queue
+import atexit
+import json
+import logging
+
+import logging_setup
+from logging_setup import SamplingFilter
+
+def record(message: str = "sent", **extra) -> logging.LogRecord:
+    entry = logging.LogRecord('test', logging.INFO, __file__, 1, message, None, None)
+    entry.__dict__.update(extra)
+    return entry
+
+def test_untagged_records_always_pass():
+    sampler = SamplingFilter(first=0, every=1000)
+    assert all(sampler.filter(record()) for _ in range(50))
+
+def test_first_then_every_nth(monkeypatch):
+    monkeypatch.setattr(logging_setup.time, 'monotonic', lambda: 100.0)
+    sampler = SamplingFilter(first=2, every=3, window=60)
+    records = [record(sample_key='broadcast') for _ in range(9)]
+    kept = [i + 1 for i, entry in enumerate(records) if sampler.filter(entry)]
+    assert kept == [1, 2, 3, 6, 9]
+    assert records[5].suppressed == 2
+    assert records[5].msg == "sent (+2 similar suppressed)"
+    assert records[0].suppressed == 0 and records[0].msg == "sent"
+
+def test_keys_are_sampled_separately(monkeypatch):
+    monkeypatch.setattr(logging_setup.time, 'monotonic', lambda: 100.0)
+    sampler = SamplingFilter(first=1, every=100, window=60)
+    assert sampler.filter(record(sample_key='ban'))
+    assert sampler.filter(record(sample_key='unban'))
+    assert not sampler.filter(record(sample_key='ban'))
+
+def test_burst_restarts_after_quiet_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logging_setup.time, 'monotonic', lambda: now[0])
+    sampler = SamplingFilter(first=1, every=100, window=60)
+    assert sampler.filter(record(sample_key='ban'))
+    assert not sampler.filter(record(sample_key='ban'))
+    now[0] += 61
+    assert sampler.filter(record(sample_key='ban'))
+
+def test_exception_survives_the_queue(capsys):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        listener = logging_setup.setup_logging(level='INFO', log_file=None, json_format=True)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger('test').exception("Broadcast %s failed", 'b1')
+        listener.stop()
+        atexit.unregister(listener.stop)
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+
+    entry = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert entry['message'] == "Broadcast b1 failed"
+    assert entry['exception'].startswith("Traceback")
+    assert "ValueError: boom" in entry['exception']
@@ -0,0 +1,65 @@
+# tests/test_stats_counters.py - Materialized /stats counters and their reconciliation
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from mongodb_database import CHANNEL_STATS_ID, MongoDBDatabase
+
+@pytest.fixture
+def database():
+    database = MongoDBDatabase(client=mongomock.MongoClient(), db_name='test_stats_counters')
+    database.reconcile_stats()
+    return database
+
+def counters(database: MongoDBDatabase) -> tuple:
+    stats = database.stats.find_one({'_id': CHANNEL_STATS_ID})
+    return stats['active_channels'], stats['total_members']
+
+def test_registration_and_member_counts_move_the_counters(database):
+    database.register_channel(-1, 'one')
+    database.register_channel(-2, 'two')
+    database.register_channel(-1, 'one')
+    assert counters(database) == (2, 0)
+
+    database.update_channel_member_count(-1, 100)
+    database.update_channel_member_count(-1, 120)
+    database.bulk_update_member_counts({'-2': 50}, previous={'-2': 0})
+    assert counters(database) == (2, 170)
+    assert database.get_stats() == (2, 170)
+
+def test_deactivation_and_reregistration(database):
+    database.register_channel(-1, 'one')
+    database.update_channel_member_count(-1, 100)
+
+    assert database.deactivate_channel(-1, reason='test')
+    assert not database.deactivate_channel(-1, reason='again')
+    assert counters(database) == (0, 0)
+
+    # Inactive channels do not move total_members
+    database.update_channel_member_count(-1, 130)
+    assert counters(database) == (0, 0)
+
+    database.register_channel(-1, 'one')
+    assert counters(database) == (1, 130)
+
+def test_bulk_registration_counts_new_and_reactivated(database):
+    database.register_channel(-1, 'one')
+    database.update_channel_member_count(-1, 40)
+    database.deactivate_channel(-1)
+    assert database.register_channels_bulk([(-1, 'one', None), (-2, 'two', None), (-3, 'three', None)]) == (2, 1)
+    assert counters(database) == (3, 40)
+
+def test_reconcile_fixes_drift(database):
+    database.register_channel(-1, 'one')
+    database.update_channel_member_count(-1, 100)
+    database.stats.update_one({'_id': CHANNEL_STATS_ID}, {'$set': {'active_channels': 9, 'total_members': 1}})
+    assert database.get_stats() == (9, 1)
+    assert database.reconcile_stats() == (1, 100)
+    assert database.get_stats() == (1, 100)
+
+def test_first_read_reconciles(database):
+    database.stats.delete_many({})
+    database.register_channel(-1, 'one')
+    database.update_channel_member_count(-1, 10)
+    database.stats.delete_many({})
+    assert database.get_stats() == (1, 10)
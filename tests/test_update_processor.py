@@ -0,0 +1,78 @@
+# tests/test_update_processor.py - Per-user/per-chat ordering of concurrently processed updates
+import asyncio
+from datetime import datetime
+
+from telegram import Chat, Message, Update, User
+
+from update_processor import PerChatUpdateProcessor
+
+def make_update(update_id: int, user_id: int, chat_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE if chat_id == user_id else Chat.CHANNEL)
+    user = User(user_id, f"user{user_id}", False)
+    return Update(update_id, message=Message(update_id, datetime.now(), chat, from_user=user))
+
+async def handler(log: list, name: str, release: asyncio.Event = None) -> None:
+    log.append(f"{name} start")
+    if release:
+        await release.wait()
+    log.append(f"{name} end")
+
+def test_same_chat_runs_in_order():
+    async def scenario():
+        processor = PerChatUpdateProcessor(max_concurrent_updates=4)
+        log, release = [], asyncio.Event()
+        first = asyncio.create_task(processor.process_update(make_update(1, 10, 10), handler(log, 'a', release)))
+        second = asyncio.create_task(processor.process_update(make_update(2, 10, 10), handler(log, 'b')))
+        await asyncio.sleep(0.01)
+        assert log == ['a start']
+        release.set()
+        await asyncio.gather(first, second)
+        assert log == ['a start', 'a end', 'b start', 'b end']
+    asyncio.run(scenario())
+
+def test_same_user_in_another_chat_waits():
+    async def scenario():
+        processor = PerChatUpdateProcessor(max_concurrent_updates=4)
+        log, release = [], asyncio.Event()
+        first = asyncio.create_task(processor.process_update(make_update(1, 10, 10), handler(log, 'a', release)))
+        second = asyncio.create_task(processor.process_update(make_update(2, 10, -100), handler(log, 'b')))
+        await asyncio.sleep(0.01)
+        assert log == ['a start']
+        release.set()
+        await asyncio.gather(first, second)
+        assert log.index('a end') < log.index('b start')
+    asyncio.run(scenario())
+
+def test_unrelated_updates_run_concurrently():
+    async def scenario():
+        processor = PerChatUpdateProcessor(max_concurrent_updates=4)
+        log, release = [], asyncio.Event()
+        first = asyncio.create_task(processor.process_update(make_update(1, 10, 10), handler(log, 'a', release)))
+        second = asyncio.create_task(processor.process_update(make_update(2, 20, 20), handler(log, 'b')))
+        await asyncio.sleep(0.01)
+        assert log == ['a start', 'b start', 'b end']
+        release.set()
+        await asyncio.gather(first, second)
+    asyncio.run(scenario())
+
+def test_busy_chat_does_not_take_every_slot():
+    async def scenario():
+        processor = PerChatUpdateProcessor(max_concurrent_updates=2)
+        log, release = [], asyncio.Event()
+        tasks = [
+            asyncio.create_task(processor.process_update(make_update(i, 10, 10), handler(log, f"a{i}", release)))
+            for i in range(3)
+        ]
+        other = asyncio.create_task(processor.process_update(make_update(9, 20, 20), handler(log, 'b')))
+        await asyncio.sleep(0.01)
+        assert log == ['a0 start', 'b start', 'b end']
+        release.set()
+        await asyncio.gather(*tasks, other)
+    asyncio.run(scenario())
+
+def test_locks_are_released():
+    async def scenario():
+        processor = PerChatUpdateProcessor(max_concurrent_updates=4)
+        await processor.process_update(make_update(1, 10, 10), handler([], 'a'))
+        assert processor._locks == {} and processor._holders == {}
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+# update_processor.py - Concurrent update handling that keeps each user's and chat's updates in order
+import asyncio
+import logging
+import os
+from typing import Awaitable, Dict, List, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Updates handled at the same time across all users and chats (1 = sequential)
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '16'))
+
+LockKey = Tuple[str, int]
+
+# Limit handed to BaseUpdateProcessor, whose own semaphore is taken before do_process_update
+_UNBOUNDED = 2 ** 31 - 1
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Processes up to max_concurrent_updates updates at once.
+
+    Updates sharing a user or a chat wait for each other, so one admin's
+    button presses and commands still run one after another while a slow
+    /ban from another admin runs alongside. The per-key lock is taken before
+    a concurrency slot, so a burst from one chat cannot fill every slot. For
+    that the base class semaphore is left unbounded and the real limit is a
+    second semaphore taken inside do_process_update once the locks are held.
+    """
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES) -> None:
+        super().__init__(_UNBOUNDED)
+        self.slots = max(1, max_concurrent_updates)
+        self._slots = asyncio.BoundedSemaphore(self.slots)
+        self._locks: Dict[LockKey, asyncio.Lock] = {}
+        self._holders: Dict[LockKey, int] = {}
+
+    @staticmethod
+    def _lock_keys(update: object) -> List[LockKey]:
+        if not isinstance(update, Update):
+            return []
+        keys = set()
+        if update.effective_user:
+            keys.add(('user', update.effective_user.id))
+        if update.effective_chat:
+            keys.add(('chat', update.effective_chat.id))
+        # A fixed order means two updates can never wait on each other's locks
+        return sorted(keys)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        keys = self._lock_keys(update)
+        for key in keys:
+            self._holders[key] = self._holders.get(key, 0) + 1
+
+        acquired: List[asyncio.Lock] = []
+        started = False
+        try:
+            for key in keys:
+                lock = self._locks.setdefault(key, asyncio.Lock())
+                await lock.acquire()
+                acquired.append(lock)
+            async with self._slots:
+                started = True
+                await coroutine
+        finally:
+            if not started:
+                coroutine.close()
+            for lock in reversed(acquired):
+                lock.release()
+            for key in keys:
+                self._holders[key] -= 1
+                if not self._holders[key]:
+                    del self._holders[key]
+                    del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -1,5 +1,5 @@
-# wsgi.py - For production deployment
-from main import app
+# wsgi.py - Production entry point: webhook mode on the bot's own asyncio server
+from main import main
 
 if __name__ == "__main__":
-    app.run()
+    main(webhook=True)